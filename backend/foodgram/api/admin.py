@@ -0,0 +1,84 @@
+from django.contrib import admin
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from api.models import RequestProfile
+from api.profiling import format_stats
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        'created',
+        'method',
+        'path',
+        'view',
+        'status',
+        'duration',
+        'query_count',
+        'trigger',
+    )
+    list_filter = ('trigger', 'method', 'view')
+    search_fields = ('path', 'view')
+    exclude = ('stats', 'queries')
+    readonly_fields = (
+        'created',
+        'method',
+        'path',
+        'view',
+        'status',
+        'duration',
+        'query_count',
+        'query_duration',
+        'trigger',
+        'stats_file',
+        'stats_report',
+        'queries_report',
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:pk>/pstats/',
+                self.admin_site.admin_view(self.download_stats),
+                name='api_requestprofile_pstats',
+            ),
+        ] + super().get_urls()
+
+    def download_stats(self, request, pk):
+        if not self.has_view_permission(request):
+            return HttpResponse(status=403)
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(
+            bytes(profile.stats), content_type='application/octet-stream')
+        response['Content-Disposition'] = (
+            f'attachment; filename=profile_{profile.pk}.pstats')
+        return response
+
+    @admin.display(description='Файл .pstats')
+    def stats_file(self, obj):
+        return format_html(
+            '<a href="{}">profile_{}.pstats</a>',
+            reverse('admin:api_requestprofile_pstats', args=[obj.pk]),
+            obj.pk
+        )
+
+    @admin.display(description='Статистика cProfile')
+    def stats_report(self, obj):
+        return format_html(
+            '<pre>{}</pre>', format_stats(bytes(obj.stats), 60))
+
+    @admin.display(description='SQL-запросы')
+    def queries_report(self, obj):
+        return format_html('<pre>{}</pre>', '\n\n'.join(
+            f'{query["duration_ms"]} мс: {query["sql"]}'
+            for query in obj.queries
+        ))
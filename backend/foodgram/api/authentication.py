@@ -0,0 +1,131 @@
+import time
+import uuid
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from users.models import AuthUser
+
+TOKEN_CACHE_PREFIX = 'auth-token'
+UNCACHED_USER_FIELDS = ('password',)
+
+
+def get_shared_cache():
+    if not settings.AUTH_TOKEN_CACHE_ALIAS:
+        return None
+    return caches[settings.AUTH_TOKEN_CACHE_ALIAS]
+
+
+def get_shared_key(key, kind=''):
+    return f'{TOKEN_CACHE_PREFIX}{kind}:{sha256(key.encode()).hexdigest()}'
+
+
+def get_generation_key(key):
+    return get_shared_key(key, '-generation')
+
+
+def get_values(instance, exclude=()):
+    return {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+        if field.attname not in exclude
+    }
+
+
+def build_instance(model, values):
+    return model.from_db('default', list(values), list(values.values()))
+
+
+class TokenCache:
+    def __init__(self):
+        self.lock = Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                return entry[1]
+            self.entries.pop(key, None)
+        shared_cache = get_shared_cache()
+        if shared_cache is None:
+            return None
+        shared_key = get_shared_key(key)
+        generation_key = get_generation_key(key)
+        cached = shared_cache.get_many([shared_key, generation_key])
+        if shared_key not in cached:
+            return None
+        generation, values = cached[shared_key]
+        if generation != cached.get(generation_key):
+            return None
+        self.set_local(key, values)
+        return values
+
+    def get_generation(self, key):
+        shared_cache = get_shared_cache()
+        if shared_cache is None:
+            return None
+        return shared_cache.get(get_generation_key(key))
+
+    def set_local(self, key, values):
+        with self.lock:
+            self.entries[key] = (
+                time.monotonic() + settings.AUTH_TOKEN_CACHE_LOCAL_TTL,
+                values
+            )
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def set(self, key, values, generation=None):
+        self.set_local(key, values)
+        shared_cache = get_shared_cache()
+        if shared_cache is not None:
+            shared_cache.set(
+                get_shared_key(key), (generation, values),
+                timeout=settings.AUTH_TOKEN_CACHE_SHARED_TTL
+            )
+
+    def delete(self, keys):
+        keys = list(keys)
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+        shared_cache = get_shared_cache()
+        if shared_cache is not None and keys:
+            shared_cache.set_many(
+                {get_generation_key(key): uuid.uuid4().hex for key in keys},
+                timeout=settings.AUTH_TOKEN_CACHE_SHARED_TTL * 2
+            )
+            shared_cache.delete_many([get_shared_key(key) for key in keys])
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        values = token_cache.get(key)
+        if values is None:
+            generation = token_cache.get_generation(key)
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, (
+                get_values(user, exclude=UNCACHED_USER_FIELDS),
+                get_values(token)
+            ), generation)
+            return user, token
+        user = build_instance(AuthUser, values[0])
+        token = build_instance(Token, values[1])
+        token.user = user
+        return user, token
@@ -0,0 +1,196 @@
+import base64
+import json
+import logging
+import mimetypes
+
+from django.conf import settings
+from django.db import connection, transaction
+from rest_framework import renderers, status
+from rest_framework.parsers import BaseParser
+
+from api.cache import bump_generation
+from api.images import schedule_image_processing
+from api.utils import (
+    change_counter,
+    get_chunks,
+    get_recipe_ingredients_prefetch,
+)
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import AuthUser
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+
+class NDJSONParser(BaseParser):
+    media_type = NDJSON_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        for line_number, line in enumerate(stream or (), 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line.decode()), None
+            except ValueError as error:
+                yield line_number, None, f'Некорректный JSON: {error}'
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    media_type = NDJSON_MEDIA_TYPE
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return b''.join(self.stream(
+            data if isinstance(data, list) else [data]))
+
+    def stream(self, items):
+        for item in items:
+            yield json.dumps(item, ensure_ascii=False).encode() + b'\n'
+
+
+def get_related_ids(chunk, field, key=None):
+    ids = set()
+    for _, data, _ in chunk:
+        items = data.get(field) if isinstance(data, dict) else None
+        for item in items if isinstance(items, list) else []:
+            try:
+                ids.add(int(item.get(key) if key else item))
+            except (AttributeError, TypeError, ValueError):
+                pass
+    return ids
+
+
+def get_ingredients(chunk):
+    return Ingredient.objects.select_related('measurement_unit').in_bulk(
+        get_related_ids(chunk, 'ingredients', 'id'))
+
+
+def get_tags(chunk):
+    return Tag.objects.in_bulk(get_related_ids(chunk, 'tags'))
+
+
+def save_recipes(author, validated):
+    recipes = []
+    with transaction.atomic():
+        for validated_data in validated:
+            validated_data = dict(validated_data)
+            validated_data.pop('recipe_ingredients')
+            validated_data.pop('tags')
+            recipes.append(Recipe(author=author, **validated_data))
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+        else:
+            for recipe in recipes:
+                recipe.save()
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=ingredient['id'],
+                amount=ingredient['amount']
+            )
+            for recipe, validated_data in zip(recipes, validated)
+            for ingredient in validated_data['recipe_ingredients']
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+            for recipe, validated_data in zip(recipes, validated)
+            for tag in validated_data['tags']
+        )
+        change_counter(AuthUser, author.id, 'recipes_count', len(recipes))
+        for recipe in recipes:
+            schedule_image_processing(recipe)
+        transaction.on_commit(bump_generation)
+    return recipes
+
+
+def bulk_create_recipes(lines, serializer_class, context):
+    author = context['request'].user
+    for chunk in get_chunks(lines, settings.RECIPES_BULK_CHUNK_SIZE):
+        context = {
+            **context,
+            'ingredients': get_ingredients(chunk),
+            'tags': get_tags(chunk),
+        }
+        results = []
+        validated = []
+        for line_number, data, error in chunk:
+            if error is not None:
+                results.append({
+                    'line': line_number,
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': {'non_field_errors': [error]},
+                })
+                continue
+            serializer = serializer_class(data=data, context=context)
+            if not serializer.is_valid():
+                results.append({
+                    'line': line_number,
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': serializer.errors,
+                })
+                continue
+            results.append({'line': line_number})
+            validated.append(serializer.validated_data)
+        try:
+            recipes = iter(
+                save_recipes(author, validated) if validated else [])
+        except Exception:
+            logger.exception('Не удалось сохранить пачку рецептов')
+            recipes = None
+        for result in results:
+            if 'status' in result:
+                continue
+            if recipes is None:
+                result['status'] = status.HTTP_500_INTERNAL_SERVER_ERROR
+                result['errors'] = {
+                    'non_field_errors': ['Не удалось сохранить рецепт.']}
+                continue
+            result['status'] = status.HTTP_201_CREATED
+            result['id'] = next(recipes).id
+        yield from results
+
+
+def get_export_rows(recipes, request, embed_images=False):
+    last_id = None
+    while True:
+        chunk = recipes.order_by('id')
+        if last_id is not None:
+            chunk = chunk.filter(id__gt=last_id)
+        chunk = list(chunk.prefetch_related(
+            'tags', get_recipe_ingredients_prefetch()
+        )[:settings.RECIPES_BULK_CHUNK_SIZE])
+        if not chunk:
+            return
+        last_id = chunk[-1].id
+        for recipe in chunk:
+            yield {
+                'id': recipe.id,
+                'name': recipe.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+                'tags': [tag.id for tag in recipe.tags.all()],
+                'ingredients': [
+                    {
+                        'id': recipe_ingredient.ingredient_id,
+                        'amount': recipe_ingredient.amount,
+                    }
+                    for recipe_ingredient in recipe.recipe_ingredients.all()
+                ],
+                'image': get_export_image(recipe, request, embed_images),
+            }
+
+
+def get_export_image(recipe, request, embed_images):
+    if not recipe.image:
+        return None
+    if not embed_images:
+        return request.build_absolute_uri(recipe.image.url)
+    media_type = mimetypes.guess_type(recipe.image.name)[0]
+    with recipe.image.open('rb') as image:
+        return (f'data:{media_type};base64,'
+                f'{base64.b64encode(image.read()).decode()}')
@@ -0,0 +1,170 @@
+import random
+import time
+from abc import ABC, abstractmethod
+from functools import wraps
+from hashlib import md5
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+RECIPES_CACHE_PREFIX = 'recipes'
+RECIPES_CACHE_PARAMS = (
+    'author',
+    'cursor',
+    'limit',
+    'ordering',
+    'page',
+    'pagination',
+    'search',
+    'tags',
+    'threshold',
+)
+RECIPES_UNCACHED_PARAMS = {
+    'ordering': ('popular',),
+}
+
+
+def get_cache():
+    return caches[settings.RECIPES_CACHE_ALIAS]
+
+
+def increment(key, initial=0):
+    cache = get_cache()
+    cache.add(key, initial, timeout=settings.RECIPES_CACHE_COUNTERS_TIMEOUT)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, initial + 1,
+                  timeout=settings.RECIPES_CACHE_COUNTERS_TIMEOUT)
+        return initial + 1
+
+
+def get_initial_version():
+    return int(time.time() * 1000)
+
+
+def get_version(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        version = get_initial_version()
+        if not cache.add(key, version,
+                         timeout=settings.RECIPES_CACHE_COUNTERS_TIMEOUT):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(key):
+    return increment(key, initial=get_initial_version())
+
+
+class VersionedSnapshot(ABC):
+    version_key = None
+
+    def __init__(self):
+        self.lock = Lock()
+        self.version = None
+        self.snapshot = None
+
+    @abstractmethod
+    def load(self):
+        pass
+
+    def bump(self):
+        return bump_version(self.version_key)
+
+    def get_version(self):
+        return get_version(self.version_key)
+
+    def get(self):
+        version = self.get_version()
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.snapshot = self.load()
+                    self.version = version
+        return self.snapshot
+
+    def refresh(self):
+        version = self.get_version()
+        with self.lock:
+            self.snapshot = self.load()
+            self.version = version
+        return self.snapshot
+
+
+def get_generation():
+    return get_version(f'{RECIPES_CACHE_PREFIX}:generation')
+
+
+def bump_generation():
+    return bump_version(f'{RECIPES_CACHE_PREFIX}:generation')
+
+
+def get_stats():
+    cache = get_cache()
+    stats = cache.get_many([
+        f'{RECIPES_CACHE_PREFIX}:hits',
+        f'{RECIPES_CACHE_PREFIX}:misses',
+    ])
+    hits = stats.get(f'{RECIPES_CACHE_PREFIX}:hits', 0)
+    misses = stats.get(f'{RECIPES_CACHE_PREFIX}:misses', 0)
+    total = hits + misses
+    return {
+        'generation': get_generation(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def record_stat(name):
+    if random.random() < settings.RECIPES_CACHE_STATS_SAMPLE_RATE:
+        increment(f'{RECIPES_CACHE_PREFIX}:{name}')
+
+
+def is_cacheable(request):
+    return not any(
+        value in values
+        for name, values in RECIPES_UNCACHED_PARAMS.items()
+        for value in request.query_params.getlist(name)
+    )
+
+
+def get_cache_key(request, action, pk=None):
+    params = []
+    for name in RECIPES_CACHE_PARAMS:
+        values = sorted(set(request.query_params.getlist(name)))
+        if values:
+            params.append(f'{name}={",".join(values)}')
+    query = md5('&'.join(params).encode()).hexdigest()
+    return (f'{RECIPES_CACHE_PREFIX}:{get_generation()}:{action}:'
+            f'{pk or ""}:{request.get_host()}:{query}')
+
+
+def cache_anonymous_response(action):
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if request.user.is_authenticated or not is_cacheable(request):
+                return method(view, request, *args, **kwargs)
+            cache = get_cache()
+            key = get_cache_key(request, action, kwargs.get('pk'))
+            data = cache.get(key)
+            if data is not None:
+                record_stat('hits')
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return response
+            record_stat('misses')
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data,
+                          timeout=settings.RECIPES_CACHE_TIMEOUT)
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
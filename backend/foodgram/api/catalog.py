@@ -0,0 +1,247 @@
+import csv
+import json
+from io import StringIO
+
+from django.core.management.color import no_style
+from django.core.serializers.python import Deserializer
+from django.db import connection, transaction
+
+from api.utils import get_chunks
+from recipes.models import Ingredient, MeasurementUnit
+
+FIXTURE_EXCLUDED_MODELS = (
+    'admin.logentry',
+    'auth.permission',
+    'contenttypes.contenttype',
+    'sessions.session',
+)
+READ_SIZE = 64 * 1024
+
+
+def iter_json_array(file):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = finished = False
+    while True:
+        chunk = file.read(READ_SIZE)
+        buffer += chunk
+        while True:
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer:
+                    break
+                if buffer[0] != '[':
+                    raise ValueError('Ожидается JSON-массив объектов.')
+                started = True
+                buffer = buffer[1:]
+                continue
+            buffer = buffer.lstrip(', \t\r\n')
+            if buffer.startswith(']'):
+                finished = True
+                break
+            if not buffer:
+                break
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except ValueError:
+                if not chunk:
+                    raise
+                break
+            buffer = buffer[end:]
+            yield item
+        if finished:
+            return
+        if not chunk:
+            raise ValueError('Неожиданный конец JSON-массива.')
+
+
+def iter_ndjson(file):
+    for line in file:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_csv(file):
+    reader = csv.reader(file)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [column.strip() for column in header]
+    if 'measurement_unit' not in header:
+        fields = ('name', 'measurement_unit')[-len(header):]
+        yield dict(zip(fields, header))
+        header = fields
+    for row in reader:
+        if row:
+            yield dict(zip(header, row))
+
+
+def iter_catalog_file(file, file_format):
+    if file_format == 'csv':
+        return iter_csv(file)
+    if file_format == 'ndjson':
+        return iter_ndjson(file)
+    return iter_json_array(file)
+
+
+def get_insert_fields(model, objs):
+    return [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key or objs[0].pk is not None
+    ]
+
+
+def get_column_values(objs, fields, raw):
+    for obj in objs:
+        yield [
+            field.get_db_prep_save(
+                getattr(obj, field.attname) if raw
+                else field.pre_save(obj, True),
+                connection
+            )
+            for field in fields
+        ]
+
+
+def format_copy_value(value):
+    if value is None:
+        return ''
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def copy_objects(model, objs, raw):
+    fields = get_insert_fields(model, objs)
+    buffer = StringIO()
+    for values in get_column_values(objs, fields, raw):
+        buffer.write(','.join(map(format_copy_value, values)) + '\n')
+    buffer.seek(0)
+    quote_name = connection.ops.quote_name
+    table = quote_name(model._meta.db_table)
+    temporary_table = quote_name(f'{model._meta.db_table}_load')
+    columns = ', '.join(quote_name(field.column) for field in fields)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {temporary_table} '
+            f'(LIKE {table} INCLUDING DEFAULTS)'
+        )
+        cursor.copy_expert(
+            f'COPY {temporary_table} ({columns}) '
+            f'FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) '
+            f'SELECT {columns} FROM {temporary_table} '
+            f'ON CONFLICT DO NOTHING'
+        )
+        cursor.execute(f'DROP TABLE {temporary_table}')
+
+
+def insert_objects(model, objs, use_copy=True, raw=False):
+    if not objs:
+        return 0
+    if use_copy and connection.vendor == 'postgresql':
+        copy_objects(model, objs, raw)
+    elif not raw:
+        model.objects.bulk_create(objs, ignore_conflicts=True)
+    else:
+        fields = get_insert_fields(model, objs)
+        batch_size = max(connection.ops.bulk_batch_size(fields, objs), 1)
+        for start in range(0, len(objs), batch_size):
+            model._base_manager._insert(
+                objs[start:start + batch_size],
+                fields=fields,
+                raw=True,
+                ignore_conflicts=True
+            )
+    return len(objs)
+
+
+def reset_sequences(models):
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+
+class CatalogLoader:
+    def __init__(self, batch_size, use_copy=True):
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.counts = {}
+        self.pending = {}
+        self.raw_models = set()
+        self.units = dict(MeasurementUnit.objects.values_list(
+            'measurement_unit', 'id'))
+
+    def count(self, model, number):
+        if not number:
+            return
+        label = model._meta.label_lower
+        self.counts[label] = self.counts.get(label, 0) + number
+
+    def load(self, items):
+        for chunk in get_chunks(items, self.batch_size):
+            rows = []
+            for item in chunk:
+                if 'model' in item:
+                    self.add_fixture_object(item)
+                else:
+                    rows.append(item)
+            self.load_catalog_rows(rows)
+        for model in list(self.pending):
+            self.flush(model)
+        return self.counts
+
+    def add_fixture_object(self, item):
+        if item['model'].lower() in FIXTURE_EXCLUDED_MODELS:
+            return
+        for deserialized in Deserializer([item], ignorenonexistent=True):
+            model = type(deserialized.object)
+            pending = self.pending.setdefault(model, [])
+            pending.append(deserialized)
+            if len(pending) >= self.batch_size:
+                self.flush(model)
+
+    def flush(self, model):
+        pending = self.pending.pop(model, [])
+        self.count(model, insert_objects(
+            model, [deserialized.object for deserialized in pending],
+            self.use_copy, raw=True
+        ))
+        self.raw_models.add(model)
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            if not through._meta.auto_created:
+                continue
+            source = f'{field.m2m_field_name()}_id'
+            target = f'{field.m2m_reverse_field_name()}_id'
+            self.count(through, insert_objects(through, [
+                through(**{source: deserialized.object.pk, target: pk})
+                for deserialized in pending
+                if deserialized.object.pk is not None
+                for pk in deserialized.m2m_data.get(field.name, ())
+            ], self.use_copy))
+            self.raw_models.add(through)
+
+    def load_catalog_rows(self, rows):
+        rows = [
+            (
+                str(row.get('name') or '').strip(),
+                str(row.get('measurement_unit') or '').strip(),
+            )
+            for row in rows
+        ]
+        missing = {unit for _, unit in rows if unit} - set(self.units)
+        if missing:
+            self.count(MeasurementUnit, insert_objects(MeasurementUnit, [
+                MeasurementUnit(measurement_unit=unit)
+                for unit in sorted(missing)
+            ], self.use_copy))
+            self.units.update(MeasurementUnit.objects.filter(
+                measurement_unit__in=missing
+            ).values_list('measurement_unit', 'id'))
+        self.count(Ingredient, insert_objects(Ingredient, [
+            Ingredient(name=name, measurement_unit_id=self.units.get(unit))
+            for name, unit in rows if name and unit
+        ], self.use_copy))
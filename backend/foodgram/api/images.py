@@ -0,0 +1,173 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connections, transaction
+from PIL import Image, ImageOps
+
+from api.cache import bump_generation
+from recipes.models import Recipe
+
+IMAGE_VARIANTS_DIR = 'recipes/images/variants'
+IMAGE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+ORIGINAL_FORMATS = {
+    'JPEG': {'quality': 95, 'comment': b''},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 90},
+}
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment')
+EXIF_ORIENTATION = 0x0112
+
+executor = None
+
+
+def get_executor():
+    global executor
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PIPELINE_WORKERS,
+            thread_name_prefix='recipe-images'
+        )
+    return executor
+
+
+def has_metadata(image):
+    return (bool(image.getexif())
+            or any(key in image.info for key in METADATA_KEYS)
+            or bool(getattr(image, 'text', None)))
+
+
+def strip_metadata(image_file):
+    with Image.open(image_file) as image:
+        options = ORIGINAL_FORMATS.get(image.format)
+        if options is None or not has_metadata(image):
+            return None
+        image_format = image.format
+        if image.getexif().get(EXIF_ORIENTATION, 1) != 1:
+            image = ImageOps.exif_transpose(image)
+        elif image_format == 'JPEG':
+            options = {
+                **options, 'quality': 'keep', 'subsampling': 'keep'}
+        stripped = tempfile.TemporaryFile()
+        image.save(stripped, image_format, **options)
+    stripped.seek(0)
+    return stripped
+
+
+def save_stripped_original(recipe):
+    with recipe.image.open('rb') as image_file:
+        stripped = strip_metadata(image_file)
+    if stripped is None:
+        return recipe.image.name
+    with stripped:
+        return default_storage.save(
+            recipe.image.field.generate_filename(
+                recipe, os.path.basename(recipe.image.name)),
+            File(stripped)
+        )
+
+
+def encode_variants(image_file, stem):
+    with Image.open(image_file) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        image = image.convert('RGB')
+        widths = [
+            width for width in settings.IMAGE_VARIANT_WIDTHS
+            if width < image.width
+        ] or [min(settings.IMAGE_VARIANT_WIDTHS)]
+        variants = {image_format: {} for image_format in IMAGE_FORMATS}
+        for width in widths:
+            resized = image.copy()
+            resized.thumbnail((width, image.height), Image.LANCZOS)
+            for image_format, (pil_format, options) in IMAGE_FORMATS.items():
+                buffer = BytesIO()
+                resized.save(buffer, pil_format, **options)
+                variants[image_format][str(resized.width)] = (
+                    f'{IMAGE_VARIANTS_DIR}/{stem}_{resized.width}.'
+                    f'{image_format}',
+                    buffer.getvalue()
+                )
+    return variants
+
+
+def process_recipe_image(recipe_id, reuse=True):
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'image', 'image_variants').first()
+    if recipe is None or not recipe.image:
+        return None
+    original_name = recipe.image.name
+    image_name = save_stripped_original(recipe)
+    image_variants = None
+    if reuse:
+        image_variants = Recipe.objects.filter(image=image_name).exclude(
+            image_variants={}).values_list('image_variants', flat=True).first()
+    if image_variants is None:
+        stem = os.path.splitext(os.path.basename(image_name))[0]
+        with default_storage.open(image_name, 'rb') as image_file:
+            encoded = encode_variants(image_file, stem)
+        image_variants = {
+            image_format: {
+                width: default_storage.save(name, ContentFile(content))
+                for width, (name, content) in widths.items()
+            }
+            for image_format, widths in encoded.items()
+        }
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=original_name
+    ).update(image=image_name, image_variants=image_variants)
+    if not updated:
+        return None
+    bump_generation()
+    return image_variants
+
+
+def run_image_processing(recipe_id):
+    close_old_connections()
+    try:
+        return process_recipe_image(recipe_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_image_processing(recipe):
+    def submit():
+        if settings.IMAGE_PIPELINE_WORKERS:
+            get_executor().submit(run_image_processing, recipe.id)
+        else:
+            process_recipe_image(recipe.id)
+    transaction.on_commit(submit)
+
+
+def get_srcset(recipe):
+    return {
+        image_format: ', '.join(
+            f'{default_storage.url(name)} {width}w'
+            for width, name in sorted(
+                widths.items(), key=lambda item: int(item[0]))
+        )
+        for image_format, widths in recipe.image_variants.items()
+    }
+
+
+def get_card_image_url(recipe):
+    widths = recipe.image_variants.get(settings.IMAGE_CARD_FORMAT)
+    if not widths:
+        return recipe.image.url if recipe.image else None
+    width = min(
+        (int(width) for width in widths
+         if int(width) >= settings.IMAGE_CARD_WIDTH),
+        default=max(int(width) for width in widths)
+    )
+    return default_storage.url(widths[str(width)])
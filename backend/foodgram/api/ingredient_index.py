@@ -0,0 +1,62 @@
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from api.cache import VersionedSnapshot
+from recipes.models import Ingredient
+
+
+def fold(name):
+    return name.casefold().replace('ё', 'е').strip()
+
+
+class IngredientIndex(VersionedSnapshot):
+    version_key = 'ingredients:version'
+
+    def __init__(self):
+        super().__init__()
+        self.checked = None
+        self.stamp = None
+
+    def get_version(self):
+        now = time.monotonic()
+        interval = settings.INGREDIENT_INDEX_CHECK_INTERVAL
+        if self.checked is None or now - self.checked >= interval:
+            stamp = Ingredient.objects.aggregate(
+                last_id=Max('id'), count=Count('id'))
+            self.stamp = (stamp['last_id'], stamp['count'])
+            self.checked = now
+        return (super().get_version(), self.stamp)
+
+    def load(self):
+        entries = [
+            {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit__measurement_unit'
+            ).order_by('id')
+        ]
+        sorted_entries = sorted(
+            entries,
+            key=lambda entry: (fold(entry['name']),
+                               entry['measurement_unit'] or '',
+                               entry['id'])
+        )
+        return (entries,
+                [fold(entry['name']) for entry in sorted_entries],
+                sorted_entries)
+
+    def search(self, query, limit=None):
+        entries, keys, sorted_entries = self.get()
+        prefix = fold(query)
+        if not prefix:
+            return entries[:limit]
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + '\U0010ffff', lo=start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return sorted_entries[start:end]
+
+
+ingredient_index = IngredientIndex()
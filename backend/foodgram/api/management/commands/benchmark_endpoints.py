@@ -0,0 +1,245 @@
+import json
+import statistics
+import time
+import tracemalloc
+from io import StringIO
+from urllib.parse import quote
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import AuthUser
+
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    }
+}
+EXPECTED_STATUSES = {'get': 200, 'post': 200, 'delete': 204}
+SCENARIOS = (
+    ('recipes_list_anonymous', None, 'get', '/api/recipes/', 6),
+    ('recipes_list', 'user', 'get', '/api/recipes/', 6),
+    ('recipes_list_limit', 'user', 'get', '/api/recipes/?limit=50', 6),
+    ('recipes_list_tags', 'user', 'get',
+     '/api/recipes/?tags={tag}&tags={other_tag}', 6),
+    ('recipes_list_author', 'user', 'get', '/api/recipes/?author={author}', 6),
+    ('recipes_list_favorited', 'user', 'get',
+     '/api/recipes/?is_favorited=1', 6),
+    ('recipes_list_in_shopping_cart', 'user', 'get',
+     '/api/recipes/?is_in_shopping_cart=1', 6),
+    ('recipes_list_search', 'user', 'get',
+     '/api/recipes/?search={search}', 7),
+    ('recipes_list_popular', 'user', 'get',
+     '/api/recipes/?ordering=popular', 6),
+    ('recipes_list_cursor', 'user', 'get',
+     '/api/recipes/?pagination=cursor', 5),
+    ('recipes_detail', 'user', 'get', '/api/recipes/{recipe}/', 5),
+    ('subscriptions', 'user', 'get',
+     '/api/users/subscriptions/?recipes_limit=3', 5),
+    ('download_shopping_cart', 'user', 'get',
+     '/api/recipes/download_shopping_cart/', 2),
+    ('ingredients_search', None, 'get', '/api/ingredients/?name={prefix}', 2),
+    ('tags_list', None, 'get', '/api/tags/', 1),
+    ('favorite_add', 'user', 'post',
+     '/api/recipes/{new_favorite}/favorite/', 6),
+    ('favorite_remove', 'user', 'delete',
+     '/api/recipes/{new_favorite}/favorite/', 7),
+    ('shopping_cart_add', 'user', 'post',
+     '/api/recipes/{new_cart}/shopping_cart/', 10),
+    ('shopping_cart_remove', 'user', 'delete',
+     '/api/recipes/{new_cart}/shopping_cart/', 10),
+    ('subscribe_add', 'user', 'post',
+     '/api/users/{new_author}/subscribe/?recipes_limit=3', 8),
+    ('subscribe_remove', 'user', 'delete',
+     '/api/users/{new_author}/subscribe/', 7),
+)
+
+
+def get_targets(user):
+    tags = list(Tag.objects.order_by('id').values_list('slug', flat=True))
+    author = AuthUser.objects.order_by('-recipes_count', 'id').first()
+    recipe = Recipe.objects.order_by('-favorites_count', 'id').first()
+    ingredient = Ingredient.objects.order_by('id').first()
+    return {
+        'tag': tags[0],
+        'other_tag': tags[-1],
+        'author': author.id,
+        'recipe': recipe.id,
+        'prefix': quote(ingredient.name[:3]),
+        'search': quote('суп'),
+        'new_favorite': Recipe.objects.exclude(
+            favorites__user=user).order_by('id').first().id,
+        'new_cart': Recipe.objects.exclude(
+            shopping_carts__user=user).order_by('id').first().id,
+        'new_author': AuthUser.objects.exclude(id=user.id).exclude(
+            subscribes__subscriber=user).order_by('id').first().id,
+    }
+
+
+def measure(client, method, url, trace_memory=False):
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method)(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return response.status_code, elapsed, len(queries), peak
+
+
+def get_status(statuses, expected):
+    unexpected = [status for status in statuses if status != expected]
+    return unexpected[0] if unexpected else expected
+
+
+class Command(BaseCommand):
+    help = ('Замер времени, количества запросов к базе и памяти для '
+            'основных эндпоинтов на фиксированном наборе данных')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='Файл для сохранения результатов в формате JSON',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Файл с результатами предыдущего запуска для сравнения',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Количество замеров времени каждого запроса',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=200,
+            help='Количество пользователей в наборе данных',
+        )
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=2000,
+            help='Количество рецептов в наборе данных',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Начальное значение генератора данных',
+        )
+
+    def handle(self, *args, **options):
+        dataset = {
+            'users': options['users'],
+            'recipes': options['recipes'],
+            'seed': options['seed'],
+        }
+        if options['repeat'] < 1:
+            raise CommandError('Количество повторов должно быть больше нуля.')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(CACHES=BENCHMARK_CACHES):
+                call_command(
+                    'generate_data',
+                    ingredients=500,
+                    carts=10,
+                    stdout=StringIO(),
+                    **dataset
+                )
+                results = self.run_scenarios(options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        previous = {}
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                previous = json.load(file)['results']
+        for name, result in results.items():
+            self.stdout.write(self.format_result(
+                name, result, previous.get(name)))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(
+                    {'dataset': dataset, 'results': results},
+                    file, ensure_ascii=False, indent=2
+                )
+        failed = [
+            name for name, result in results.items()
+            if result['status'] != result['expected_status']
+        ]
+        if failed:
+            raise CommandError(
+                f'Неожиданный статус ответа: {", ".join(failed)}')
+        exceeded = [
+            name for name, result in results.items()
+            if result['queries'] > result['budget']
+        ]
+        if exceeded:
+            raise CommandError(
+                f'Превышен бюджет запросов: {", ".join(exceeded)}')
+
+    def run_scenarios(self, repeat):
+        user = AuthUser.objects.annotate(
+            carts=Count('shopping_carts', distinct=True),
+            follows=Count('subscribers', distinct=True),
+        ).order_by('-carts', '-follows', 'id').first()
+        clients = {None: APIClient(), 'user': APIClient()}
+        clients['user'].force_authenticate(user)
+        targets = get_targets(user)
+        samples = {}
+        for round_number in range(repeat + 1):
+            for name, client, method, url, budget in SCENARIOS:
+                samples.setdefault(name, []).append(measure(
+                    clients[client], method, url.format(**targets),
+                    trace_memory=round_number == repeat
+                ))
+        return {
+            name: {
+                'method': method.upper(),
+                'url': url.format(**targets),
+                'status': get_status(
+                    [sample[0] for sample in samples[name]],
+                    EXPECTED_STATUSES[method]
+                ),
+                'expected_status': EXPECTED_STATUSES[method],
+                'time_ms': round(statistics.median(
+                    sample[1] for sample in samples[name][:-1]) * 1000, 2),
+                'queries': max(sample[2] for sample in samples[name]),
+                'budget': budget,
+                'memory_kb': round(samples[name][-1][3] / 1024, 1),
+            }
+            for name, client, method, url, budget in SCENARIOS
+        }
+
+    def format_result(self, name, result, previous):
+        line = (f'{name}: {result["status"]}, {result["time_ms"]} мс, '
+                f'запросов {result["queries"]}/{result["budget"]}, '
+                f'память {result["memory_kb"]} КБ')
+        if previous:
+            line += (f' (было {previous["time_ms"]} мс, '
+                     f'запросов {previous["queries"]})')
+        if (result['queries'] > result['budget']
+                or result['status'] != result['expected_status']):
+            line = self.style.ERROR(line)
+        return line
@@ -0,0 +1,139 @@
+import base64
+import json
+import math
+import os
+import tracemalloc
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from PIL import Image
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.views import RecipeViewSet
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import AuthUser
+
+
+def make_photo(size):
+    side = int(math.sqrt(size / 3))
+    while True:
+        image = Image.frombytes(
+            'RGB', (side, side), os.urandom(side * side * 3))
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', quality=95)
+        if buffer.tell() >= size:
+            return buffer.getvalue()
+        side = int(side * math.sqrt(size / buffer.tell())) + 1
+
+
+class Command(BaseCommand):
+    help = ('Сравнение пикового потребления памяти при загрузке картинки '
+            'рецепта в base64 и через multipart/form-data')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            type=float,
+            default=10,
+            help='Размер фотографии в мегабайтах',
+        )
+        parser.add_argument(
+            '--max-multipart-peak',
+            type=float,
+            default=1,
+            help=('Допустимый пик памяти при загрузке через multipart '
+                  'в мегабайтах'),
+        )
+        parser.add_argument(
+            '--user',
+            help='Email автора рецепта, по умолчанию первый пользователь',
+        )
+
+    def handle(self, *args, **options):
+        users = AuthUser.objects.order_by('id')
+        if options['user']:
+            users = users.filter(email=options['user'])
+        user = users.first()
+        tag = Tag.objects.order_by('id').first()
+        ingredient = Ingredient.objects.order_by('id').first()
+        if user is None or tag is None or ingredient is None:
+            raise CommandError(
+                'Нужны хотя бы один пользователь, тег и ингредиент.')
+        photo = make_photo(int(options['size'] * 1024 * 1024))
+        self.stdout.write(f'Фотография: {len(photo) / 1024 / 1024:.1f} МБ')
+        data = {
+            'name': 'Тестовый рецепт',
+            'text': 'Тестовый рецепт',
+            'cooking_time': 1,
+        }
+        factory = APIRequestFactory()
+        requests = (
+            ('base64', factory.post(
+                '/api/recipes/',
+                json.dumps({
+                    **data,
+                    'tags': [tag.id],
+                    'ingredients': [{'id': ingredient.id, 'amount': 1}],
+                    'image': ('data:image/jpeg;base64,'
+                              + base64.b64encode(photo).decode()),
+                }),
+                content_type='application/json'
+            )),
+            ('multipart', factory.post(
+                '/api/recipes/',
+                {
+                    **data,
+                    'tags': [tag.id],
+                    'ingredients[0]id': ingredient.id,
+                    'ingredients[0]amount': 1,
+                    'image': SimpleUploadedFile('photo.jpg', photo),
+                },
+                format='multipart'
+            )),
+        )
+        view = RecipeViewSet.as_view({'post': 'create'})
+        peaks = {}
+        for name, request in requests:
+            force_authenticate(request, user=user)
+            body_size = int(request.META['CONTENT_LENGTH'])
+            host = request.META['SERVER_NAME']
+            with override_settings(ALLOWED_HOSTS=[host]):
+                peak, status_code = self.measure(view, request)
+            self.stdout.write(
+                f'{name}: тело запроса {body_size / 1024 / 1024:.1f} МБ, '
+                f'пик памяти {peak / 1024 / 1024:.1f} МБ, '
+                f'статус {status_code}'
+            )
+            if status_code != 201:
+                raise CommandError(f'{name}: статус {status_code}')
+            peaks[name] = (body_size, peak)
+        body_size, peak = peaks['multipart']
+        if (body_size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+                and peak > options['max_multipart_peak'] * 1024 * 1024):
+            raise CommandError(
+                f'Пик памяти при загрузке через multipart '
+                f'{peak / 1024 / 1024:.1f} МБ превышает '
+                f'{options["max_multipart_peak"]} МБ.'
+            )
+
+    def measure(self, view, request):
+        tracemalloc.start()
+        try:
+            with transaction.atomic():
+                response = view(request)
+                peak = tracemalloc.get_traced_memory()[1]
+                image_names = list(Recipe.objects.filter(
+                    pk=response.data.get('id')).values_list(
+                        'image', flat=True))
+                transaction.set_rollback(True)
+        finally:
+            tracemalloc.stop()
+            request.close()
+        for image_name in image_names:
+            default_storage.delete(image_name)
+        return peak, response.status_code
@@ -0,0 +1,77 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from api.authentication import CachedTokenAuthentication, token_cache
+from api.views import AuthUserViewSet
+from users.models import AuthUser
+
+AUTHENTICATION_CLASSES = (TokenAuthentication, CachedTokenAuthentication)
+
+
+class Command(BaseCommand):
+    help = ('Сравнение времени ответа /api/users/me/ с обычной и '
+            'кэширующей аутентификацией по токену')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=1000,
+            help='Количество запросов для каждого класса аутентификации',
+        )
+        parser.add_argument(
+            '--user',
+            help='Email пользователя, по умолчанию первый пользователь',
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('Количество запросов должно быть больше нуля.')
+        users = AuthUser.objects.filter(is_active=True).order_by('id')
+        if options['user']:
+            users = users.filter(email=options['user'])
+        user = users.first()
+        if user is None:
+            raise CommandError('Пользователь не найден.')
+        factory = APIRequestFactory()
+        with transaction.atomic():
+            token, _ = Token.objects.get_or_create(user=user)
+            for authentication_class in AUTHENTICATION_CLASSES:
+                token_cache.clear()
+                token_cache.delete([token.key])
+                view = AuthUserViewSet.as_view(
+                    {'get': 'retrieve_request_user'},
+                    authentication_classes=[authentication_class]
+                )
+                timings = []
+                with CaptureQueriesContext(connection) as queries:
+                    for _ in range(options['requests']):
+                        request = factory.get(
+                            '/api/users/me/',
+                            HTTP_AUTHORIZATION=f'Token {token.key}'
+                        )
+                        started = time.perf_counter()
+                        response = view(request)
+                        timings.append(time.perf_counter() - started)
+                        if response.status_code != 200:
+                            raise CommandError(
+                                f'{authentication_class.__name__}: '
+                                f'статус {response.status_code}')
+                timings.sort()
+                self.stdout.write(
+                    f'{authentication_class.__name__}: '
+                    f'медиана {statistics.median(timings) * 1000:.3f} мс, '
+                    f'p95 {timings[int(len(timings) * 0.95)] * 1000:.3f} мс, '
+                    f'запросов к базе {len(queries) / len(timings):.2f} '
+                    f'на запрос'
+                )
+            transaction.set_rollback(True)
+        token_cache.clear()
+        token_cache.delete([token.key])
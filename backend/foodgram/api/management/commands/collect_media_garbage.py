@@ -0,0 +1,87 @@
+import os
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import Recipe
+
+MEDIA_DIRS = ('recipes/images',)
+
+
+def get_referenced_names(batch_size):
+    names = set()
+    for image, image_variants in Recipe.objects.exclude(image='').values_list(
+            'image', 'image_variants').iterator(chunk_size=batch_size):
+        names.add(image)
+        for widths in image_variants.values():
+            names.update(widths.values())
+    return names
+
+
+def walk(path):
+    dirs, files = default_storage.listdir(path)
+    for name in files:
+        yield os.path.join(path, name)
+    for name in dirs:
+        yield from walk(os.path.join(path, name))
+
+
+class Command(BaseCommand):
+    help = 'Удаление картинок рецептов, на которые больше нет ссылок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать количество неиспользуемых файлов',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество файлов, удаляемых за один проход',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=3600,
+            help='Не трогать файлы моложе указанного числа секунд',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        referenced = get_referenced_names(batch_size)
+        created_before = timezone.now() - timedelta(
+            seconds=options['min_age'])
+        unreferenced = (
+            name
+            for media_dir in MEDIA_DIRS if default_storage.exists(media_dir)
+            for name in walk(media_dir)
+            if name not in referenced
+            and default_storage.get_modified_time(name) < created_before
+        )
+        batch = []
+        found = deleted = 0
+        for name in unreferenced:
+            found += 1
+            if options['dry_run']:
+                continue
+            batch.append(name)
+            if len(batch) >= batch_size:
+                deleted += self.delete(batch, batch_size)
+                batch = []
+        if batch:
+            deleted += self.delete(batch, batch_size)
+        self.stdout.write(
+            f'Неиспользуемых файлов: {found}, удалено: {deleted}')
+
+    def delete(self, names, batch_size):
+        still_referenced = get_referenced_names(batch_size)
+        deleted = 0
+        for name in names:
+            if name not in still_referenced:
+                default_storage.delete(name)
+                deleted += 1
+        return deleted
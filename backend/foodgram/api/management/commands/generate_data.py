@@ -0,0 +1,247 @@
+import random
+import time
+from bisect import bisect
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from api.cache import bump_generation
+from api.catalog import insert_objects, reset_sequences
+from api.ingredient_index import ingredient_index
+from api.shopping_cart import rebuild_shopping_cart_totals
+from api.tag_snapshot import tag_snapshot
+from api.utils import get_chunks
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    MeasurementUnit,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Subscribe,
+    Tag,
+)
+from users.models import AuthUser
+
+MEASUREMENT_UNITS = ('г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.', 'стакан')
+WORDS = (
+    'быстрый', 'домашний', 'запеченный', 'легкий', 'летний', 'мамин',
+    'овощной', 'острый', 'пряный', 'сливочный', 'сытный', 'томатный',
+    'пирог', 'салат', 'суп', 'рагу', 'омлет', 'соус', 'паста', 'плов',
+)
+START_DATE = datetime(2023, 1, 1, tzinfo=timezone.utc)
+PERIOD = timedelta(days=365)
+
+
+class ZipfSampler:
+    def __init__(self, values, exponent, rng):
+        self.values = list(values)
+        rng.shuffle(self.values)
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, len(self.values) + 1)
+        ))
+        self.rng = rng
+
+    def __len__(self):
+        return len(self.values)
+
+    def sample(self):
+        return self.values[bisect(
+            self.cum_weights, self.rng.random() * self.cum_weights[-1])]
+
+    def sample_distinct(self, count, exclude=None):
+        count = min(count, len(self.values) - (exclude is not None))
+        values = set()
+        for _ in range(count * 10):
+            if len(values) >= count:
+                break
+            value = self.sample()
+            if value != exclude:
+                values.add(value)
+        return values
+
+
+def get_next_id(model):
+    return (model.objects.aggregate(max_id=Max('pk'))['max_id'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = ('Генерация синтетических пользователей, рецептов, избранного, '
+            'корзин покупок и подписок для нагрузочного тестирования')
+
+    def add_arguments(self, parser):
+        for name, default, help_text in (
+            ('users', 1000, 'Количество пользователей'),
+            ('recipes', 10000, 'Количество рецептов'),
+            ('tags', 10, 'Количество тэгов'),
+            ('ingredients', 2000, 'Количество ингредиентов'),
+            ('favorites', 20, 'Среднее число рецептов в избранном'),
+            ('carts', 3, 'Среднее число рецептов в корзине покупок'),
+            ('follows', 10, 'Среднее число подписок пользователя'),
+            ('min-recipe-ingredients', 2, 'Минимум ингредиентов в рецепте'),
+            ('max-recipe-ingredients', 20, 'Максимум ингредиентов в рецепте'),
+            ('seed', 0, 'Начальное значение генератора случайных чисел'),
+            ('batch-size', 5000, 'Количество строк в одной вставке'),
+        ):
+            parser.add_argument(
+                f'--{name}', type=int, default=default, help=help_text)
+        parser.add_argument(
+            '--zipf',
+            type=float,
+            default=1.1,
+            help='Показатель распределения Ципфа для популярности авторов, '
+                 'рецептов и ингредиентов',
+        )
+        parser.add_argument(
+            '--password',
+            default='password',
+            help='Пароль всех созданных пользователей',
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Не использовать COPY на PostgreSQL',
+        )
+
+    def handle(self, *args, **options):
+        if not (1 <= options['min_recipe_ingredients']
+                <= options['max_recipe_ingredients']):
+            raise CommandError('Некорректные границы числа ингредиентов.')
+        started = time.monotonic()
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.counts = {}
+        with transaction.atomic():
+            self.generate()
+            reset_sequences([Tag, Ingredient, AuthUser, Recipe])
+            call_command('reconcile_counters', stdout=self.stdout)
+            rebuild_shopping_cart_totals()
+            transaction.on_commit(ingredient_index.bump)
+            transaction.on_commit(tag_snapshot.bump)
+            transaction.on_commit(bump_generation)
+        for label, count in self.counts.items():
+            self.stdout.write(f'{label}: {count}')
+        self.stdout.write(
+            f'Генерация заняла {time.monotonic() - started:.1f} с')
+
+    def insert(self, model, objs, raw=False):
+        for chunk in get_chunks(objs, self.options['batch_size']):
+            count = insert_objects(
+                model, chunk, not self.options['no_copy'], raw)
+            label = model._meta.label_lower
+            self.counts[label] = self.counts.get(label, 0) + count
+
+    def get_spread(self, mean, maximum):
+        if not mean:
+            return 0
+        return min(round(self.rng.expovariate(1 / mean)), maximum)
+
+    def generate(self):
+        options = self.options
+        rng = self.rng
+        exponent = options['zipf']
+        self.insert(MeasurementUnit, (
+            MeasurementUnit(measurement_unit=unit)
+            for unit in MEASUREMENT_UNITS
+        ))
+        unit_ids = list(MeasurementUnit.objects.filter(
+            measurement_unit__in=MEASUREMENT_UNITS
+        ).order_by('measurement_unit').values_list('id', flat=True))
+
+        first_id = get_next_id(Tag)
+        self.insert(Tag, (
+            Tag(id=pk, name=f'Тэг {pk}', color=f'#{pk:06x}', slug=f'tag-{pk}')
+            for pk in range(first_id, first_id + options['tags'])
+        ), raw=True)
+        first_id = get_next_id(Ingredient)
+        self.insert(Ingredient, (
+            Ingredient(
+                id=pk,
+                name=f'Ингредиент {pk}',
+                measurement_unit_id=rng.choice(unit_ids)
+            )
+            for pk in range(first_id, first_id + options['ingredients'])
+        ), raw=True)
+        first_id = get_next_id(AuthUser)
+        user_ids = range(first_id, first_id + options['users'])
+        password = make_password(options['password'])
+        self.insert(AuthUser, (
+            AuthUser(
+                id=pk,
+                username=f'synthetic{pk}',
+                email=f'synthetic{pk}@example.com',
+                first_name='Пользователь',
+                last_name=str(pk),
+                password=password,
+                date_joined=START_DATE,
+            )
+            for pk in user_ids
+        ), raw=True)
+        tag_ids = list(Tag.objects.order_by('id').values_list('id', flat=True))
+        ingredients = ZipfSampler(
+            Ingredient.objects.order_by('id').values_list('id', flat=True),
+            exponent, rng
+        )
+        if not user_ids or not ingredients or not tag_ids:
+            raise CommandError(
+                'Нужны хотя бы один пользователь, тэг и ингредиент.')
+        authors = ZipfSampler(user_ids, exponent, rng)
+
+        first_id = get_next_id(Recipe)
+        recipe_ids = range(first_id, first_id + options['recipes'])
+        self.insert(Recipe, (
+            Recipe(
+                id=pk,
+                author_id=authors.sample(),
+                name=' '.join(rng.sample(WORDS, 2)).capitalize(),
+                text=' '.join(rng.choices(WORDS, k=30)),
+                cooking_time=rng.randint(1, 180),
+                pub_date=START_DATE + PERIOD * rng.random(),
+            )
+            for pk in recipe_ids
+        ), raw=True)
+        self.insert(Recipe.tags.through, (
+            Recipe.tags.through(recipe_id=pk, tag_id=tag_id)
+            for pk in recipe_ids
+            for tag_id in rng.sample(
+                tag_ids, rng.randint(1, min(3, len(tag_ids))))
+        ))
+        minimum = options['min_recipe_ingredients']
+        maximum = options['max_recipe_ingredients']
+        self.insert(RecipeIngredient, (
+            RecipeIngredient(
+                recipe_id=pk,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500)
+            )
+            for pk in recipe_ids
+            for ingredient_id in ingredients.sample_distinct(round(
+                rng.triangular(minimum, maximum, min(minimum + 3, maximum))))
+        ))
+        if not recipe_ids:
+            return
+
+        recipes = ZipfSampler(recipe_ids, exponent, rng)
+        for model, mean in (
+            (Favorite, options['favorites']),
+            (ShoppingCart, options['carts']),
+        ):
+            self.insert(model, (
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in recipes.sample_distinct(
+                    self.get_spread(mean, len(recipes)))
+            ))
+        self.insert(Subscribe, (
+            Subscribe(subscriber_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in authors.sample_distinct(
+                self.get_spread(options['follows'], len(authors)),
+                exclude=user_id
+            )
+        ))
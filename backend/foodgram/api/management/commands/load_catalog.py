@@ -0,0 +1,80 @@
+import os
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.cache import bump_generation
+from api.catalog import CatalogLoader, iter_catalog_file, reset_sequences
+from api.ingredient_index import ingredient_index
+from api.shopping_cart import rebuild_shopping_cart_totals
+from api.tag_snapshot import tag_snapshot
+
+FILE_FORMATS = {
+    '.csv': 'csv',
+    '.json': 'json',
+    '.jsonl': 'ndjson',
+    '.ndjson': 'ndjson',
+}
+CATALOG_LABELS = {
+    'recipes.ingredient',
+    'recipes.measurementunit',
+    'recipes.tag',
+}
+
+
+class Command(BaseCommand):
+    help = ('Быстрая загрузка фикстуры dumpdata или списков ингредиентов '
+            'и единиц измерения в формате CSV/NDJSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='+',
+            help='Файлы .json (dumpdata или массив ингредиентов), .csv '
+                 'или .ndjson',
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(set(FILE_FORMATS.values())),
+            help='Формат файлов, по умолчанию определяется по расширению',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Количество строк, вставляемых за один запрос',
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Не использовать COPY на PostgreSQL',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        loader = CatalogLoader(options['batch_size'], not options['no_copy'])
+        with transaction.atomic():
+            for path in options['paths']:
+                file_format = options['format'] or FILE_FORMATS.get(
+                    os.path.splitext(path)[1].lower())
+                if file_format is None:
+                    raise CommandError(
+                        f'Не удалось определить формат файла {path}.')
+                try:
+                    with open(path, encoding='utf-8', newline='') as file:
+                        loader.load(iter_catalog_file(file, file_format))
+                except (OSError, ValueError) as error:
+                    raise CommandError(f'{path}: {error}')
+            reset_sequences(loader.raw_models)
+            if set(loader.counts) - CATALOG_LABELS:
+                call_command('reconcile_counters', stdout=self.stdout)
+                rebuild_shopping_cart_totals()
+            transaction.on_commit(ingredient_index.bump)
+            transaction.on_commit(tag_snapshot.bump)
+            transaction.on_commit(bump_generation)
+        for label, count in sorted(loader.counts.items()):
+            self.stdout.write(f'{label}: {count}')
+        self.stdout.write(
+            f'Загрузка заняла {time.monotonic() - started:.1f} с')
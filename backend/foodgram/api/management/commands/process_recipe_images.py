@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from api.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создание уменьшенных копий и WebP-вариантов картинок рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересоздать варианты для всех рецептов',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(image_variants={})
+        processed = 0
+        for recipe_id in recipes.values_list('id', flat=True).iterator():
+            try:
+                image_variants = process_recipe_image(
+                    recipe_id, reuse=not options['all'])
+            except OSError as error:
+                self.stderr.write(f'Рецепт {recipe_id}: {error}')
+                continue
+            if image_variants is not None:
+                processed += 1
+        self.stdout.write(f'Обработано картинок: {processed}')
@@ -0,0 +1,32 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from api.cache import bump_generation, get_cache, get_stats
+
+
+class Command(BaseCommand):
+    help = 'Статистика кэша ответов для рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--invalidate',
+            action='store_true',
+            help='Сбросить кэш, увеличив номер поколения',
+        )
+
+    def handle(self, *args, **options):
+        if isinstance(get_cache(), LocMemCache):
+            self.stderr.write(
+                'Кэш хранится в памяти процесса: статистика и сброс '
+                'не затрагивают воркеры приложения. Укажите общий кэш '
+                'в CACHE_BACKEND и CACHE_LOCATION.'
+            )
+        if options['invalidate']:
+            bump_generation()
+        stats = get_stats()
+        self.stdout.write(
+            f'Поколение: {stats["generation"]}\n'
+            f'Попадания (в выборке): {stats["hits"]}\n'
+            f'Промахи (в выборке): {stats["misses"]}\n'
+            f'Доля попаданий: {stats["hit_ratio"]:.2%}'
+        )
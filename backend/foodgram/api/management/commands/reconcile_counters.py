@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from api.utils import count_related
+from recipes.models import Favorite, Recipe, ShoppingCart, Subscribe
+from users.models import AuthUser
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (AuthUser, 'followers_count', Subscribe, 'author'),
+    (AuthUser, 'recipes_count', Recipe, 'author'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Проверка и исправление счетчиков избранного, корзин и подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, не исправляя их',
+        )
+
+    def handle(self, *args, **options):
+        for model, field, related_model, related_field in COUNTERS:
+            expected = count_related(related_model, related_field)
+            with transaction.atomic():
+                drifted = list(model.objects.annotate(
+                    expected=expected
+                ).exclude(
+                    **{field: F('expected')}
+                ).values_list('pk', flat=True))
+                if drifted and not options['dry_run']:
+                    model.objects.filter(pk__in=drifted).update(
+                        **{field: expected})
+            self.stdout.write(
+                f'{model.__name__}.{field}: расхождений {len(drifted)}')
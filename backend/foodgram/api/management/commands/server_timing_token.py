@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.middleware import get_server_timing_token
+from users.models import AuthUser
+
+
+class Command(BaseCommand):
+    help = ('Выдача подписанного значения заголовка X-Server-Timing для '
+            'инструментирования запросов администратором')
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email администратора')
+
+    def handle(self, *args, **options):
+        user = AuthUser.objects.filter(
+            email=options['email'], is_staff=True, is_active=True).first()
+        if user is None:
+            raise CommandError('Администратор с таким email не найден.')
+        self.stdout.write(get_server_timing_token(user))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.shopping_cart import (
+    get_expected_shopping_cart_totals,
+    get_stored_shopping_cart_totals,
+    rebuild_shopping_cart_totals,
+)
+
+
+class Command(BaseCommand):
+    help = 'Пересчет или проверка сводных списков покупок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только проверить сводные списки, не изменяя их',
+        )
+        parser.add_argument(
+            '--user',
+            action='append',
+            type=int,
+            dest='user_ids',
+            help='Идентификатор пользователя (можно указать несколько раз)',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        if not options['verify']:
+            count = rebuild_shopping_cart_totals(user_ids)
+            self.stdout.write(f'Пересчитано строк: {count}')
+            return
+        expected = get_expected_shopping_cart_totals(user_ids)
+        stored = get_stored_shopping_cart_totals(user_ids)
+        mismatches = [
+            (key, expected.get(key, 0), stored.get(key, 0))
+            for key in sorted({*expected, *stored})
+            if expected.get(key, 0) != stored.get(key, 0)
+        ]
+        for (user_id, ingredient_id), expected_amount, amount in mismatches:
+            self.stdout.write(
+                f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                f'ожидается {expected_amount}, сохранено {amount}'
+            )
+        if mismatches:
+            raise CommandError(f'Найдено расхождений: {len(mismatches)}')
+        self.stdout.write('Расхождений нет')
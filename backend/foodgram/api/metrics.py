@@ -0,0 +1,265 @@
+import atexit
+import fcntl
+import glob
+import json
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+
+from django.conf import settings
+from django.http import HttpResponse
+
+METRICS_PREFIX = 'foodgram_http_'
+METRICS_HELP = {
+    'requests_total': ('counter', 'Количество обработанных запросов'),
+    'requests_in_flight': ('gauge', 'Количество запросов в обработке'),
+    'request_duration_seconds': (
+        'histogram', 'Время обработки запроса в секундах'),
+}
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def get_file_name(pid):
+    return os.path.join(settings.METRICS_DIR, f'metrics_{pid}.json')
+
+
+def get_aggregate_file_name():
+    return os.path.join(settings.METRICS_DIR, 'aggregate.json')
+
+
+def read_snapshot(file_name):
+    try:
+        with open(file_name) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        return {}
+
+
+def write_snapshot(file_name, snapshot):
+    with open(f'{file_name}.tmp', 'w') as file:
+        json.dump(snapshot, file)
+    os.replace(f'{file_name}.tmp', file_name)
+
+
+def merge_snapshot(merged, snapshot, gauges=True):
+    for kind, values in snapshot.items():
+        if kind == 'gauge' and not gauges:
+            continue
+        for name, labels, value in values:
+            key = (name, tuple(tuple(label) for label in labels))
+            if kind != 'histogram':
+                merged[kind][key] = merged[kind].get(key, 0) + value
+                continue
+            total = merged[kind].setdefault(key, [0] * len(value))
+            for index, item in enumerate(value):
+                total[index] += item
+    return merged
+
+
+def dump_merged(merged):
+    return {
+        kind: [
+            [name, [list(label) for label in labels], value]
+            for (name, labels), value in values.items()
+        ]
+        for kind, values in merged.items()
+    }
+
+
+@contextmanager
+def metrics_lock():
+    with open(os.path.join(settings.METRICS_DIR, 'metrics.lock'), 'a') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def archive(file_name):
+    snapshot = read_snapshot(file_name)
+    if snapshot is None:
+        return
+    merged = {'counter': {}, 'gauge': {}, 'histogram': {}}
+    merge_snapshot(merged, read_snapshot(get_aggregate_file_name()) or {})
+    merge_snapshot(merged, snapshot, gauges=False)
+    del merged['gauge']
+    write_snapshot(get_aggregate_file_name(), dump_merged(merged))
+    os.remove(file_name)
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = Lock()
+        self.flush_lock = Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.values = {'counter': {}, 'gauge': {}, 'histogram': {}}
+        self.flushed = 0.0
+        self.written = False
+
+    def check_pid(self):
+        if os.getpid() != self.pid:
+            self.reset()
+
+    def inc(self, name, labels, value=1):
+        with self.lock:
+            self.check_pid()
+            values = self.values[METRICS_HELP[name][0]]
+            values[(name, labels)] = values.get((name, labels), 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = settings.METRICS_LATENCY_BUCKETS
+        with self.lock:
+            self.check_pid()
+            histogram = self.values['histogram'].setdefault(
+                (name, labels), [0] * (len(buckets) + 1) + [0.0])
+            histogram[bisect_left(buckets, value)] += 1
+            histogram[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            self.check_pid()
+            return dump_merged(self.values)
+
+    def flush(self, force=False):
+        if not settings.METRICS_DIR:
+            return
+        now = time.monotonic()
+        if not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        if not self.flush_lock.acquire(blocking=False):
+            return
+        try:
+            self.flushed = now
+            snapshot = self.snapshot()
+            file_name = get_file_name(os.getpid())
+            if not self.written:
+                with metrics_lock():
+                    archive(file_name)
+                self.written = True
+            write_snapshot(file_name, snapshot)
+        finally:
+            self.flush_lock.release()
+
+    def collect(self):
+        merged = merge_snapshot(
+            {'counter': {}, 'gauge': {}, 'histogram': {}}, self.snapshot())
+        if not settings.METRICS_DIR:
+            return merged
+        with metrics_lock():
+            for file_name in glob.glob(get_file_name('*')):
+                pid = int(os.path.basename(file_name)[8:-5])
+                if pid == os.getpid():
+                    continue
+                if not is_alive(pid):
+                    archive(file_name)
+                    continue
+                snapshot = read_snapshot(file_name)
+                if snapshot:
+                    merge_snapshot(merged, snapshot)
+            return merge_snapshot(
+                merged, read_snapshot(get_aggregate_file_name()) or {},
+                gauges=False
+            )
+
+
+registry = MetricsRegistry()
+atexit.register(registry.flush, force=True)
+
+
+def format_labels(labels):
+    return '{' + ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace(
+            '"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    ) + '}'
+
+
+def render_metrics(merged):
+    buckets = settings.METRICS_LATENCY_BUCKETS
+    lines = []
+    for name, (kind, help_text) in METRICS_HELP.items():
+        metric = f'{METRICS_PREFIX}{name}'
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {kind}')
+        for (key_name, labels), value in sorted(merged[kind].items()):
+            if key_name != name:
+                continue
+            if kind != 'histogram':
+                lines.append(f'{metric}{format_labels(labels)} {value}')
+                continue
+            count = 0
+            for bound, bucket_count in zip(
+                    (*map(str, buckets), '+Inf'), value[:-1]):
+                count += bucket_count
+                lines.append(
+                    f'{metric}_bucket'
+                    f'{format_labels((*labels, ("le", bound)))} {count}'
+                )
+            lines.append(f'{metric}_sum{format_labels(labels)} {value[-1]}')
+            lines.append(f'{metric}_count{format_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def get_view_label(view_func, method):
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    action = (getattr(view_func, 'actions', None) or {}).get(method.lower())
+    return f'{cls.__name__}.{action}' if action else cls.__name__
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        request.metrics_view = None
+        try:
+            response = self.get_response(request)
+        finally:
+            view = request.metrics_view
+            if view is not None:
+                registry.inc(
+                    'requests_in_flight', (('view', view),), -1)
+        labels = (
+            ('view', view or 'unresolved'),
+            ('method', request.method),
+        )
+        registry.observe(
+            'request_duration_seconds', labels,
+            time.perf_counter() - started
+        )
+        registry.inc(
+            'requests_total',
+            (*labels, ('status', str(response.status_code)))
+        )
+        registry.flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = get_view_label(view_func, request.method)
+        registry.inc('requests_in_flight', (('view', request.metrics_view),))
+
+
+def metrics(request):
+    return HttpResponse(
+        render_metrics(registry.collect()), content_type=CONTENT_TYPE)
@@ -0,0 +1,151 @@
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+
+from users.models import AuthUser
+
+logger = logging.getLogger(__name__)
+
+SERVER_TIMING_SALT = 'api.middleware.server_timing'
+
+PLACEHOLDERS_RE = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+NUMBERS_RE = re.compile(r'\b\d+\b')
+
+
+def get_fingerprint(sql):
+    return NUMBERS_RE.sub('?', PLACEHOLDERS_RE.sub('(...)', sql))
+
+
+def get_server_timing_token(user):
+    return signing.dumps({'user': user.id}, salt=SERVER_TIMING_SALT)
+
+
+def is_server_timing_requested(request):
+    token = request.META.get(settings.SQL_INSTRUMENTATION_HEADER)
+    if not token:
+        return False
+    try:
+        user_id = signing.loads(
+            token, salt=SERVER_TIMING_SALT,
+            max_age=settings.SQL_INSTRUMENTATION_TOKEN_MAX_AGE
+        )['user']
+    except signing.BadSignature:
+        return False
+    return AuthUser.objects.filter(
+        id=user_id, is_staff=True, is_active=True).exists()
+
+
+class QueryRecorder:
+    def __init__(self, log_limit=0):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self.log_limit = log_limit
+        self.log = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.duration += duration
+            self.count += 1
+            self.statements[sql] += 1
+            if len(self.log) < self.log_limit:
+                self.log.append({
+                    'sql': sql,
+                    'duration_ms': round(duration * 1000, 3),
+                })
+
+    def record(self):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    def get_repeated(self):
+        fingerprints = Counter()
+        for sql, count in self.statements.items():
+            fingerprints[get_fingerprint(sql)] += count
+        return [
+            (fingerprint, count)
+            for fingerprint, count in fingerprints.most_common()
+            if count >= settings.SQL_REPEATED_QUERY_THRESHOLD
+        ]
+
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.SQL_INSTRUMENTATION_ENABLED:
+            return self.get_response(request)
+        requested = is_server_timing_requested(request)
+        if (not requested and random.random()
+                >= settings.SQL_INSTRUMENTATION_SAMPLE_RATE):
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with recorder.record():
+            response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if requested or (user is not None and user.is_staff):
+            response['Server-Timing'] = self.get_server_timing(
+                recorder, started)
+        if response.streaming:
+            response.streaming_content = self.record_stream(
+                request, response, recorder, started,
+                response.streaming_content
+            )
+        else:
+            self.log_slow_request(request, response, recorder, started)
+        return response
+
+    def get_server_timing(self, recorder, started):
+        duration = (time.perf_counter() - started) * 1000
+        db_duration = recorder.duration * 1000
+        repeated = recorder.get_repeated()
+        server_timing = [
+            f'db;dur={db_duration:.2f};desc="{recorder.count} queries"',
+            f'app;dur={duration - db_duration:.2f}',
+        ]
+        if repeated:
+            server_timing.append(
+                f'db-repeated;desc="{sum(count for _, count in repeated)} '
+                f'queries, {len(repeated)} statements"'
+            )
+        return ', '.join(server_timing)
+
+    def record_stream(self, request, response, recorder, started, content):
+        with recorder.record():
+            yield from content
+        self.log_slow_request(request, response, recorder, started)
+
+    def log_slow_request(self, request, response, recorder, started):
+        duration = (time.perf_counter() - started) * 1000
+        if duration < settings.SLOW_REQUEST_THRESHOLD_MS:
+            return
+        logger.warning(json.dumps({
+            'event': 'slow_request',
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'duration_ms': round(duration, 2),
+            'db_duration_ms': round(recorder.duration * 1000, 2),
+            'queries': recorder.count,
+            'repeated_queries': [
+                {'sql': fingerprint, 'count': count}
+                for fingerprint, count in recorder.get_repeated()[
+                    :settings.SLOW_REQUEST_LOGGED_QUERIES]
+            ],
+        }, ensure_ascii=False))
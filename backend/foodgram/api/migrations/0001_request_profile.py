@@ -0,0 +1,36 @@
+# Generated by Django 3.2 on 2026-10-18 06:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('path', models.CharField(max_length=2000, verbose_name='Адрес')),
+                ('view', models.CharField(blank=True, max_length=200, verbose_name='Представление')),
+                ('status', models.PositiveSmallIntegerField(verbose_name='Статус')),
+                ('duration', models.FloatField(verbose_name='Время (мс)')),
+                ('query_count', models.PositiveIntegerField(verbose_name='SQL-запросов')),
+                ('query_duration', models.FloatField(verbose_name='Время SQL-запросов (мс)')),
+                ('queries', models.JSONField(default=list, verbose_name='SQL-запросы')),
+                ('stats', models.BinaryField(verbose_name='Статистика cProfile')),
+                ('trigger', models.CharField(choices=[('header', 'Подписанный заголовок'), ('query', 'Параметр запроса'), ('sample', 'Случайная выборка')], max_length=10, verbose_name='Причина')),
+            ],
+            options={
+                'verbose_name': 'Профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
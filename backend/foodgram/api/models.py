@@ -0,0 +1,59 @@
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    TRIGGERS = (
+        ('header', 'Подписанный заголовок'),
+        ('query', 'Параметр запроса'),
+        ('sample', 'Случайная выборка'),
+    )
+
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата',
+    )
+    method = models.CharField(
+        max_length=10,
+        verbose_name='Метод',
+    )
+    path = models.CharField(
+        max_length=2000,
+        verbose_name='Адрес',
+    )
+    view = models.CharField(
+        max_length=200,
+        blank=True,
+        verbose_name='Представление',
+    )
+    status = models.PositiveSmallIntegerField(
+        verbose_name='Статус',
+    )
+    duration = models.FloatField(
+        verbose_name='Время (мс)',
+    )
+    query_count = models.PositiveIntegerField(
+        verbose_name='SQL-запросов',
+    )
+    query_duration = models.FloatField(
+        verbose_name='Время SQL-запросов (мс)',
+    )
+    queries = models.JSONField(
+        default=list,
+        verbose_name='SQL-запросы',
+    )
+    stats = models.BinaryField(
+        verbose_name='Статистика cProfile',
+    )
+    trigger = models.CharField(
+        max_length=10,
+        choices=TRIGGERS,
+        verbose_name='Причина',
+    )
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+
+    def __str__(self):
+        return f'{self.method} {self.path[:50]}'
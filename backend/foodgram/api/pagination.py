@@ -1,6 +1,132 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    @classmethod
+    def is_requested(cls, request):
+        return (cls.cursor_query_param in request.query_params
+                or request.query_params.get(cls.mode_query_param) == 'cursor')
+
+    def get_page_size(self, request):
+        page_size = request.query_params.get(self.page_size_query_param)
+        if page_size and page_size.isdigit() and int(page_size) > 0:
+            return min(int(page_size), self.max_page_size)
+        return self.page_size
+
+    def get_fields(self, queryset, ordering):
+        fields = []
+        for field_name in ordering:
+            name = field_name.lstrip('-')
+            field = queryset.model._meta.get_field(
+                'id' if name == 'pk' else name)
+            fields.append((name, field, field_name.startswith('-')))
+        return fields
+
+    def encode_cursor(self, reverse, instance):
+        position = [
+            field.value_to_string(instance) for _, field, _ in self.fields]
+        cursor = json.dumps({'r': int(reverse), 'p': position})
+        return urlsafe_b64encode(cursor.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return False, None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode()))
+            position = [
+                field.to_python(value)
+                for (_, field, _), value in zip(self.fields, cursor['p'])
+            ]
+            if len(position) != len(self.fields) or None in position:
+                raise ValueError
+            return bool(cursor['r']), position
+        except (BinasciiError, FieldDoesNotExist, KeyError, TypeError,
+                ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_position_filter(self, position, reverse):
+        position_filter = Q()
+        equal = Q()
+        for (name, _, descending), value in zip(self.fields, position):
+            lookup = 'lt' if descending != reverse else 'gt'
+            position_filter |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return position_filter
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = view.cursor_ordering
+        self.fields = self.get_fields(queryset, ordering)
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        reverse, position = self.decode_cursor(request)
+        if reverse:
+            ordering = [
+                name[1:] if name.startswith('-') else f'-{name}'
+                for name in ordering
+            ]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_position_filter(position, reverse))
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+        has_next = has_more if not reverse else position is not None
+        has_previous = has_more if reverse else position is not None
+        self.next_cursor = (self.encode_cursor(False, results[-1])
+                            if has_next and results else None)
+        self.previous_cursor = (self.encode_cursor(True, results[0])
+                                if has_previous and results else None)
+        return results
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.base_url, self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(self.next_cursor),
+            'previous': self.get_link(self.previous_cursor),
+            'results': data,
+        })
 
 
 class PageLimitPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+    cursor_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if (getattr(view, 'cursor_ordering', None)
+                and self.cursor_pagination_class.is_requested(request)):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
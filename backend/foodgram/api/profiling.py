@@ -0,0 +1,114 @@
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+from api.metrics import get_view_label
+from api.middleware import QueryRecorder
+from api.models import RequestProfile
+from users.models import AuthUser
+
+PROFILING_SALT = 'api.profiling'
+
+
+def get_profiling_token(user):
+    return signing.dumps({'user': user.id}, salt=PROFILING_SALT)
+
+
+def get_trigger(request):
+    token = request.META.get(settings.PROFILING_HEADER)
+    if token:
+        try:
+            user_id = signing.loads(
+                token, salt=PROFILING_SALT,
+                max_age=settings.PROFILING_TOKEN_MAX_AGE
+            )['user']
+        except signing.BadSignature:
+            user_id = None
+        if user_id is not None and AuthUser.objects.filter(
+                id=user_id, is_staff=True, is_active=True).exists():
+            return 'header'
+    user = getattr(request, 'user', None)
+    if (request.GET.get(settings.PROFILING_QUERY_PARAM) == '1'
+            and user is not None and user.is_staff):
+        return 'query'
+    if random.random() < settings.PROFILING_SAMPLE_RATE:
+        return 'sample'
+    return None
+
+
+def prune_profiles():
+    if settings.PROFILING_RETENTION_DAYS:
+        RequestProfile.objects.filter(
+            created__lt=timezone.now() - timedelta(
+                days=settings.PROFILING_RETENTION_DAYS)
+        ).delete()
+    if settings.PROFILING_MAX_PROFILES:
+        boundary = RequestProfile.objects.order_by('-id').values_list(
+            'id', flat=True)[settings.PROFILING_MAX_PROFILES:][:1]
+        if boundary:
+            RequestProfile.objects.filter(id__lte=boundary[0]).delete()
+
+
+def load_stats(data, stream=None):
+    return pstats.Stats(
+        SimpleNamespace(stats=marshal.loads(data), create_stats=lambda: None),
+        stream=stream
+    )
+
+
+def format_stats(data, limit):
+    stream = io.StringIO()
+    load_stats(data, stream).sort_stats('cumulative').print_stats(limit)
+    return stream.getvalue()
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        trigger = get_trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+        request.profiling_view = ''
+        profiler = cProfile.Profile()
+        recorder = QueryRecorder(log_limit=settings.PROFILING_LOGGED_QUERIES)
+        started = time.perf_counter()
+        with recorder.record():
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = (time.perf_counter() - started) * 1000
+        profiler.create_stats()
+        profile = RequestProfile.objects.create(
+            method=request.method[:10],
+            path=request.get_full_path()[:2000],
+            view=request.profiling_view[:200],
+            status=response.status_code,
+            duration=duration,
+            query_count=recorder.count,
+            query_duration=recorder.duration * 1000,
+            queries=recorder.log,
+            stats=marshal.dumps(profiler.stats),
+            trigger=trigger,
+        )
+        prune_profiles()
+        if trigger != 'sample':
+            response['X-Profile-Id'] = str(profile.id)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, 'profiling_view'):
+            request.profiling_view = get_view_label(
+                view_func, request.method)
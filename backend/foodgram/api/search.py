@@ -0,0 +1,201 @@
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import CharField, FloatField, Func, Q, TextField, Value
+from django.db.models.functions import Greatest
+from django.db.models.lookups import PostgresOperatorLookup
+
+from api.cache import RECIPES_CACHE_PREFIX, VersionedSnapshot
+from api.ingredient_index import IngredientIndex
+from recipes.models import Ingredient, Recipe
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+class TrigramWordSimilar(PostgresOperatorLookup):
+    lookup_name = 'trigram_word_similar'
+    postgres_operator = '%%>'
+
+
+CharField.register_lookup(TrigramWordSimilar)
+TextField.register_lookup(TrigramWordSimilar)
+
+
+class TrigramWordSimilarity(Func):
+    function = 'WORD_SIMILARITY'
+    output_field = FloatField()
+
+    def __init__(self, string, expression, **extra):
+        if not hasattr(string, 'resolve_expression'):
+            string = Value(string)
+        super().__init__(string, expression, **extra)
+
+
+def get_word_trigrams(text):
+    trigrams = []
+    for word in WORD_PATTERN.findall(text.lower()):
+        word = f'  {word} '
+        trigrams.append({word[i:i + 3] for i in range(len(word) - 2)})
+    return trigrams
+
+
+def get_similarity(first, second):
+    union = len(first | second)
+    return len(first & second) / union if union else 0.0
+
+
+def get_word_similarity(query_words, text_words):
+    width = len(query_words)
+    query_trigrams = set().union(*query_words)
+    return max(
+        (
+            get_similarity(
+                query_trigrams, set().union(*text_words[i:i + width]))
+            for i in range(max(len(text_words) - width + 1, 1))
+        ),
+        default=0.0
+    )
+
+
+class TrigramIndex:
+    def __init__(self, rows):
+        self.words = {}
+        self.postings = defaultdict(set)
+        for pk, *texts in rows:
+            self.words[pk] = [get_word_trigrams(text or '') for text in texts]
+            for text_words in self.words[pk]:
+                for trigram in set().union(*text_words):
+                    self.postings[trigram].add(pk)
+
+    def search(self, query, word_fields, threshold):
+        query_words = get_word_trigrams(query)
+        query_trigrams = set().union(*query_words)
+        if not query_trigrams:
+            return {}
+        candidates = set()
+        for trigram in query_trigrams:
+            candidates |= self.postings.get(trigram, set())
+        scores = {}
+        for pk in candidates:
+            score = max(
+                get_word_similarity(query_words, text_words) if word
+                else get_similarity(query_trigrams, set().union(*text_words))
+                for text_words, word in zip(self.words[pk], word_fields)
+            )
+            if score >= threshold:
+                scores[pk] = score
+        return scores
+
+
+class SearchIndex(VersionedSnapshot):
+    def __init__(self, model, version_key, fields, word_fields=()):
+        super().__init__()
+        self.model = model
+        self.version_key = version_key
+        self.fields = fields
+        self.word_fields = word_fields
+
+    def load(self):
+        return TrigramIndex(self.model.objects.order_by().values_list(
+            'pk', *self.fields, *self.word_fields))
+
+    def search(self, query, threshold):
+        return self.get().search(
+            query,
+            [False] * len(self.fields) + [True] * len(self.word_fields),
+            threshold
+        )
+
+
+ingredient_search = SearchIndex(
+    Ingredient, IngredientIndex.version_key, ('name',))
+recipe_search = SearchIndex(
+    Recipe, f'{RECIPES_CACHE_PREFIX}:generation', ('name',), ('text',))
+
+
+class SearchResults:
+    def __init__(self, queryset, ids, scores):
+        self.queryset = queryset
+        self.ids = ids
+        self.scores = scores
+
+    def __len__(self):
+        return len(self.ids)
+
+    def count(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1 or None][0]
+        ids = self.ids[index]
+        instances = self.queryset.in_bulk(ids)
+        for instance in instances.values():
+            instance.similarity = self.scores[instance.pk]
+        return [instances[pk] for pk in ids]
+
+
+def sort_ids(rows, ordering):
+    ids = list(rows)
+    for position, name in reversed(list(enumerate(ordering))):
+        ids.sort(
+            key=lambda pk: rows[pk][position],
+            reverse=name.startswith('-')
+        )
+    return ids
+
+
+def get_threshold(request):
+    threshold = request.query_params.get('threshold')
+    try:
+        return min(max(float(threshold), 0.0), 1.0)
+    except (TypeError, ValueError):
+        return settings.SEARCH_SIMILARITY_THRESHOLD
+
+
+def set_trigram_thresholds(connection, threshold):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT set_config('pg_trgm.similarity_threshold', %s, false), "
+            "set_config('pg_trgm.word_similarity_threshold', %s, false)",
+            [str(threshold), str(threshold)]
+        )
+
+
+def search_queryset(queryset, query, index, threshold=None,
+                    ordering=('pk',), ranked=True):
+    if threshold is None:
+        threshold = settings.SEARCH_SIMILARITY_THRESHOLD
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        set_trigram_thresholds(connection, threshold)
+        candidates = Q()
+        similarities = []
+        for field in index.fields:
+            candidates |= Q(**{f'{field}__trigram_similar': query})
+            similarities.append(TrigramSimilarity(field, query))
+        for field in index.word_fields:
+            candidates |= Q(**{f'{field}__trigram_word_similar': query})
+            similarities.append(TrigramWordSimilarity(query, field))
+        similarity = (Greatest(*similarities)
+                      if len(similarities) > 1 else similarities[0])
+        return queryset.filter(candidates).annotate(
+            similarity=similarity
+        ).filter(similarity__gte=threshold).order_by('-similarity', *ordering)
+    scores = index.search(query, threshold)
+    queryset = queryset.filter(pk__in=scores)
+    if not ranked:
+        return queryset
+    rows = {
+        pk: (scores[pk], *values)
+        for pk, *values in queryset.order_by().values_list(
+            'pk', *(name.lstrip('-') for name in ordering))
+    }
+    return SearchResults(
+        queryset, sort_ids(rows, ('-similarity', *ordering)), scores)
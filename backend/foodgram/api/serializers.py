@@ -1,9 +1,29 @@
 from django.contrib.auth import password_validation
 from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.files.uploadedfile import UploadedFile
+from django.db import models, transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers, exceptions
 
-from api.utils import create_and_add_ingredients_to_recipe
+from api.cache import bump_generation
+from api.images import (
+    get_card_image_url,
+    get_srcset,
+    schedule_image_processing,
+)
+from api.shopping_cart import (
+    get_cart_user_ids,
+    update_shopping_cart_totals,
+)
+from api.tag_snapshot import tag_snapshot
+from api.utils import (
+    create_and_add_ingredients_to_recipe,
+    get_recipe_ingredients_prefetch,
+    get_recipes_by_author,
+    get_recipes_limit,
+    get_subscription_context,
+    update_recipe_ingredients,
+)
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -11,7 +31,6 @@ from recipes.models import (
     Recipe,
     RecipeIngredient,
     ShoppingCart,
-    Subscribe,
     Tag,
 )
 from users.models import AuthUser
@@ -71,11 +90,40 @@ class AuthUserSerializer(serializers.ModelSerializer):
         return user
 
 
+class SubscribedListSerializer(serializers.ListSerializer):
+    def get_authors(self, instances):
+        return instances
+
+    def to_representation(self, data):
+        instances = list(
+            data.all() if isinstance(data, models.Manager) else data)
+        get_subscription_context(self.context['request']).preload(
+            self.get_authors(instances))
+        return super().to_representation(instances)
+
+
+class SubscribeListSerializer(SubscribedListSerializer):
+    def to_representation(self, data):
+        instances = list(
+            data.all() if isinstance(data, models.Manager) else data)
+        self.context['recipes_by_author'] = get_recipes_by_author(
+            [author.id for author in instances],
+            get_recipes_limit(self.context['request'])
+        )
+        return super().to_representation(instances)
+
+
+class RecipeListSerializer(SubscribedListSerializer):
+    def get_authors(self, instances):
+        return [recipe.author for recipe in instances]
+
+
 class AuthUserListSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = AuthUser
+        list_serializer_class = SubscribedListSerializer
         fields = (
             'email',
             'id',
@@ -86,11 +134,8 @@ class AuthUserListSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, author):
-        return (self.context['request'].user.is_authenticated
-                and Subscribe.objects.filter(
-                    subscriber=self.context['request'].user,
-                    author=author
-                ).exists())
+        return get_subscription_context(
+            self.context['request']).is_subscribed(author)
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -108,24 +153,96 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit')
 
 
+class PreloadedPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    def get_preloaded(self):
+        return None
+
+    def to_internal_value(self, data):
+        preloaded = self.get_preloaded()
+        if preloaded is None:
+            return super().to_internal_value(data)
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            instance = preloaded.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
+
+
+class IngredientPrimaryKeyField(PreloadedPrimaryKeyField):
+    ingredients = None
+
+    def get_preloaded(self):
+        return self.ingredients
+
+
+class TagPrimaryKeyField(PreloadedPrimaryKeyField):
+    def get_preloaded(self):
+        return self.context.get('tags')
+
+
+class RecipeIngredientListSerializer(serializers.ListSerializer):
+    def get_ingredient_ids(self, data):
+        ids = set()
+        for item in data if isinstance(data, list) else []:
+            try:
+                ids.add(int(item.get('id')))
+            except (AttributeError, TypeError, ValueError):
+                pass
+        return ids
+
+    def to_internal_value(self, data):
+        field = self.child.fields['id']
+        field.ingredients = self.context.get('ingredients')
+        if field.ingredients is None:
+            field.ingredients = Ingredient.objects.select_related(
+                'measurement_unit').in_bulk(self.get_ingredient_ids(data))
+        try:
+            return super().to_internal_value(data)
+        finally:
+            field.ingredients = None
+
+
 class RecipeIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
+    id = IngredientPrimaryKeyField(
         required=True, queryset=Ingredient.objects.all())
 
     class Meta:
         model = RecipeIngredient
+        list_serializer_class = RecipeIngredientListSerializer
         fields = ('id', 'amount')
 
 
+class RecipeImageField(Base64ImageField):
+    def to_internal_value(self, data):
+        if not isinstance(data, UploadedFile):
+            return super().to_internal_value(data)
+        image = serializers.ImageField.to_internal_value(self, data)
+        extension = image.image.format.lower()
+        extension = 'jpg' if extension == 'jpeg' else extension
+        if extension not in self.ALLOWED_TYPES:
+            raise exceptions.ValidationError(self.INVALID_TYPE_MESSAGE)
+        image.name = f'{self.get_file_name(image)}.{extension}'
+        return image
+
+
 class RecipeSerializer(serializers.ModelSerializer):
-    ingredients = RecipeIngredientSerializer(many=True)
+    tags = TagPrimaryKeyField(
+        many=True, allow_empty=False, queryset=Tag.objects.all())
+    ingredients = RecipeIngredientSerializer(
+        many=True, source='recipe_ingredients')
     author = AuthUserListSerializer(read_only=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
+    image_srcset = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Recipe
+        list_serializer_class = RecipeListSerializer
         fields = (
             'id',
             'tags',
@@ -135,6 +252,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_srcset',
             'text',
             'cooking_time'
         )
@@ -149,7 +267,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         if not ingredients:
             raise exceptions.ValidationError(
                 'Этот список не может быть пустым.')
-        check_doubles = []
+        check_doubles = set()
         for ingredient in ingredients:
             amount = ingredient.get('amount')
             if not amount or amount <= 0:
@@ -165,7 +283,7 @@ class RecipeSerializer(serializers.ModelSerializer):
                     ]
                 )
             ingredient = ingredient['id']
-            if ingredient in check_doubles:
+            if ingredient.id in check_doubles:
                 raise exceptions.ValidationError(
                     [
                         {},
@@ -177,10 +295,12 @@ class RecipeSerializer(serializers.ModelSerializer):
                         }
                     ]
                 )
-            check_doubles.append(ingredient)
+            check_doubles.add(ingredient.id)
         return ingredients
 
     def get_is_favorited(self, recipe):
+        if hasattr(recipe, 'is_favorited'):
+            return recipe.is_favorited
         return (self.context['request'].user.is_authenticated
                 and Favorite.objects.filter(
                     user=self.context['request'].user,
@@ -188,63 +308,93 @@ class RecipeSerializer(serializers.ModelSerializer):
                 ).exists())
 
     def get_is_in_shopping_cart(self, recipe):
+        if hasattr(recipe, 'is_in_shopping_cart'):
+            return recipe.is_in_shopping_cart
         return (self.context['request'].user.is_authenticated
                 and ShoppingCart.objects.filter(
                     user=self.context['request'].user,
                     recipe=recipe
                 ).exists())
 
+    def get_image_srcset(self, recipe):
+        return get_srcset(recipe)
+
     def create(self, validated_data):
-        ingredients = validated_data.pop('ingredients')
+        ingredients = validated_data.pop('recipe_ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
         create_and_add_ingredients_to_recipe(recipe, ingredients)
         for tag in tags:
             recipe.tags.add(tag)
+        schedule_image_processing(recipe)
         return recipe
 
     def update(self, recipe, validated_data):
-        tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('ingredients')
-        if ingredients:
-            recipe.ingredients.all().delete()
-            create_and_add_ingredients_to_recipe(recipe, ingredients)
-        if tags:
-            recipe.tags.clear()
-            for tag in tags:
-                recipe.tags.add(tag)
-        return super().update(recipe, validated_data)
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('recipe_ingredients', None)
+        if 'image' in validated_data:
+            validated_data['image_variants'] = {}
+        changed_fields = [
+            field for field, value in validated_data.items()
+            if field == 'image' or getattr(recipe, field) != value
+        ]
+        deltas = {}
+        with transaction.atomic():
+            if ingredients:
+                deltas = update_recipe_ingredients(recipe, ingredients)
+                if any(deltas.values()):
+                    update_shopping_cart_totals(
+                        get_cart_user_ids(recipe), deltas)
+            if tags:
+                recipe.tags.set(tags)
+            for field in changed_fields:
+                setattr(recipe, field, validated_data[field])
+            if changed_fields:
+                recipe.save(update_fields=changed_fields)
+            elif any(deltas.values()):
+                bump_generation()
+        if 'image' in validated_data:
+            schedule_image_processing(recipe)
+        return recipe
 
     def to_representation(self, instance):
+        models.prefetch_related_objects(
+            [instance], 'tags', get_recipe_ingredients_prefetch())
         to_rep = super().to_representation(instance)
-        to_rep['tags'] = instance.tags.all().values(
-            'id', 'name', 'color', 'slug')
-        ingredients = instance.ingredients.all().values(
-            'ingredient__id',
-            'ingredient__name',
-            'ingredient__measurement_unit__measurement_unit',
-            'amount'
+        to_rep['tags'], self.context['tag_catalog'] = tag_snapshot.resolve(
+            (tag.id for tag in instance.tags.all()),
+            self.context.get('tag_catalog')
         )
         to_rep['ingredients'] = []
-        for ingredient in ingredients:
+        for recipe_ingredient in instance.recipe_ingredients.all():
+            ingredient = recipe_ingredient.ingredient
+            measurement_unit = ingredient.measurement_unit
             to_rep['ingredients'].append(
                 {
-                    'id': ingredient['ingredient__id'],
-                    'name': ingredient['ingredient__name'],
-                    'measurement_unit': ingredient[
-                        'ingredient__measurement_unit__measurement_unit'],
-                    'amount': ingredient['amount']
+                    'id': ingredient.id,
+                    'name': ingredient.name,
+                    'measurement_unit': (measurement_unit.measurement_unit
+                                         if measurement_unit else None),
+                    'amount': recipe_ingredient.amount
                 }
             )
-        to_rep['image'] = instance.image.url
+        to_rep['image'] = (get_card_image_url(instance)
+                           if self.parent is not None
+                           else instance.image.url if instance.image
+                           else None)
         return to_rep
 
 
 class RecipeFavoriteSerializer(serializers.ModelSerializer):
+    image = serializers.SerializerMethodField(read_only=True)
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
 
+    def get_image(self, recipe):
+        return get_card_image_url(recipe)
+
 
 class SubscribeSerializer(serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField(read_only=True)
@@ -253,6 +403,7 @@ class SubscribeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = AuthUser
+        list_serializer_class = SubscribeListSerializer
         fields = (
             'email',
             'id',
@@ -265,25 +416,19 @@ class SubscribeSerializer(serializers.ModelSerializer):
         )
 
     def get_recipes_count(self, subscription):
-        return Recipe.objects.filter(author=subscription).count()
+        return subscription.recipes_count
 
     def get_recipes(self, subscription):
-        recipes = Recipe.objects.filter(author=subscription)
-        recipes_limit = self.context['request'].query_params.get(
-            'recipes_limit')
-        recipes_limit = (int(recipes_limit)
-                         if recipes_limit and recipes_limit.isdigit()
-                         else None)
-        if recipes_limit and recipes_limit > 0:
-            recipes = recipes[:recipes_limit]
-        if recipes:
-            serializer = RecipeFavoriteSerializer(recipes, many=True)
-            return serializer.data
-        return []
+        recipes_by_author = self.context.get('recipes_by_author')
+        if recipes_by_author is None:
+            recipes_by_author = get_recipes_by_author(
+                [subscription.id],
+                get_recipes_limit(self.context['request'])
+            )
+        serializer = RecipeFavoriteSerializer(
+            recipes_by_author.get(subscription.id, []), many=True)
+        return serializer.data
 
     def get_is_subscribed(self, author):
-        return (self.context['request'].user.is_authenticated
-                and Subscribe.objects.filter(
-                    subscriber=self.context['request'].user,
-                    author=author
-                ).exists())
+        return get_subscription_context(
+            self.context['request']).is_subscribed(author)
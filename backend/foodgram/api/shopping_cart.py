@@ -0,0 +1,255 @@
+import csv
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from io import BytesIO
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.http import Http404
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework import exceptions, renderers
+from rest_framework.negotiation import DefaultContentNegotiation
+
+from recipes.models import (
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingCartIngredient,
+)
+
+SHOPPING_CART_FILENAME = 'shopping_cart'
+SHOPPING_CART_CHUNK_SIZE = 2000
+SHOPPING_CART_HEADER = ('Ингредиент', 'Ед. измерения', 'Количество')
+
+
+def get_shopping_cart_ingredients(user):
+    return ShoppingCartIngredient.objects.filter(
+        user=user,
+        amount__gt=0
+    ).order_by(
+        'ingredient__name',
+        'ingredient__measurement_unit__measurement_unit',
+    ).values_list(
+        'ingredient__name',
+        'ingredient__measurement_unit__measurement_unit',
+        'amount',
+    ).iterator(chunk_size=SHOPPING_CART_CHUNK_SIZE)
+
+
+def get_recipe_amounts(recipe):
+    amounts = defaultdict(int)
+    for ingredient_id, amount in RecipeIngredient.objects.filter(
+            recipe=recipe).values_list('ingredient_id', 'amount'):
+        amounts[ingredient_id] += amount
+    return amounts
+
+
+def get_amounts_delta(old_amounts, new_amounts):
+    return {
+        ingredient_id: (new_amounts.get(ingredient_id, 0)
+                        - old_amounts.get(ingredient_id, 0))
+        for ingredient_id in {*old_amounts, *new_amounts}
+    }
+
+
+def get_cart_user_ids(recipe):
+    return list(ShoppingCart.objects.filter(
+        recipe=recipe).values_list('user_id', flat=True))
+
+
+def update_shopping_cart_totals(user_ids, deltas):
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items() if delta
+    }
+    if not user_ids or not deltas:
+        return
+    ShoppingCartIngredient.objects.bulk_create(
+        [
+            ShoppingCartIngredient(
+                user_id=user_id, ingredient_id=ingredient_id, amount=0)
+            for user_id in user_ids
+            for ingredient_id, delta in deltas.items() if delta > 0
+        ],
+        batch_size=SHOPPING_CART_CHUNK_SIZE,
+        ignore_conflicts=True
+    )
+    totals = ShoppingCartIngredient.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=deltas)
+    totals.update(amount=F('amount') + Case(
+        *[
+            When(ingredient_id=ingredient_id, then=Value(delta))
+            for ingredient_id, delta in deltas.items()
+        ],
+        default=Value(0),
+        output_field=IntegerField()
+    ))
+    totals.filter(amount__lte=0).delete()
+
+
+def add_recipe_to_shopping_cart_totals(user, recipe, sign=1):
+    update_shopping_cart_totals(
+        [user.id],
+        {
+            ingredient_id: sign * amount
+            for ingredient_id, amount in get_recipe_amounts(recipe).items()
+        }
+    )
+
+
+def remove_recipe_from_shopping_cart_totals(user, recipe):
+    add_recipe_to_shopping_cart_totals(user, recipe, sign=-1)
+
+
+def get_expected_shopping_cart_totals(user_ids=None):
+    totals = RecipeIngredient.objects.filter(
+        recipe__shopping_carts__isnull=False)
+    if user_ids is not None:
+        totals = totals.filter(recipe__shopping_carts__user__in=user_ids)
+    return {
+        (user_id, ingredient_id): total_amount
+        for user_id, ingredient_id, total_amount in totals.values(
+            'recipe__shopping_carts__user', 'ingredient'
+        ).annotate(
+            total_amount=Sum('amount')
+        ).order_by().values_list(
+            'recipe__shopping_carts__user', 'ingredient', 'total_amount'
+        ).iterator(chunk_size=SHOPPING_CART_CHUNK_SIZE)
+    }
+
+
+def get_stored_shopping_cart_totals(user_ids=None):
+    totals = ShoppingCartIngredient.objects.filter(amount__gt=0)
+    if user_ids is not None:
+        totals = totals.filter(user_id__in=user_ids)
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in totals.values_list(
+            'user_id', 'ingredient_id', 'amount'
+        ).iterator(chunk_size=SHOPPING_CART_CHUNK_SIZE)
+    }
+
+
+def rebuild_shopping_cart_totals(user_ids=None):
+    expected = get_expected_shopping_cart_totals(user_ids)
+    with transaction.atomic():
+        totals = ShoppingCartIngredient.objects.all()
+        if user_ids is not None:
+            totals = totals.filter(user_id__in=user_ids)
+        totals.delete()
+        ShoppingCartIngredient.objects.bulk_create(
+            (
+                ShoppingCartIngredient(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    amount=amount
+                )
+                for (user_id, ingredient_id), amount in expected.items()
+            ),
+            batch_size=SHOPPING_CART_CHUNK_SIZE
+        )
+    return len(expected)
+
+
+class ShoppingCartRenderer(renderers.BaseRenderer, ABC):
+    charset = 'utf-8'
+    streaming = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return renderers.JSONRenderer().render(data)
+
+    def get_content_type(self):
+        if self.charset:
+            return f'{self.media_type}; charset={self.charset}'
+        return self.media_type
+
+    def get_filename(self):
+        return f'{SHOPPING_CART_FILENAME}.{self.format}'
+
+    @abstractmethod
+    def stream(self, ingredients):
+        pass
+
+
+class TextShoppingCartRenderer(ShoppingCartRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        for name, measurement_unit, amount in ingredients:
+            yield f'- {name} [{measurement_unit}]: {amount}\n'.encode()
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class CSVShoppingCartRenderer(ShoppingCartRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(SHOPPING_CART_HEADER).encode()
+        for row in ingredients:
+            yield writer.writerow(row).encode()
+
+
+class PDFShoppingCartRenderer(ShoppingCartRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    streaming = False
+    font_name = 'ShoppingCartFont'
+    font_size = 12
+    margin = 50
+    line_height = 18
+
+    def register_font(self):
+        if self.font_name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(
+                TTFont(self.font_name, settings.SHOPPING_CART_PDF_FONT))
+
+    def stream(self, ingredients):
+        self.register_font()
+        buffer = BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+        y = height - self.margin
+        pdf.setFont(self.font_name, self.font_size)
+        for name, measurement_unit, amount in ingredients:
+            if y < self.margin:
+                pdf.showPage()
+                pdf.setFont(self.font_name, self.font_size)
+                y = height - self.margin
+            pdf.drawString(
+                self.margin, y, f'- {name} [{measurement_unit}]: {amount}')
+            y -= self.line_height
+        pdf.save()
+        yield buffer.getvalue()
+
+
+SHOPPING_CART_RENDERERS = (
+    TextShoppingCartRenderer,
+    CSVShoppingCartRenderer,
+    PDFShoppingCartRenderer,
+)
+
+
+class ShoppingCartContentNegotiation(DefaultContentNegotiation):
+    def select_renderer(self, request, renderers, format_suffix=None):
+        format_query = format_suffix or request.query_params.get(
+            self.settings.URL_FORMAT_OVERRIDE)
+        if format_query:
+            for renderer in renderers:
+                if renderer.format == format_query:
+                    return renderer, renderer.media_type
+            raise Http404
+        try:
+            return super().select_renderer(request, renderers)
+        except exceptions.NotAcceptable:
+            return renderers[0], renderers[0].media_type
@@ -0,0 +1,74 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from api.cache import bump_generation
+from api.ingredient_index import ingredient_index
+from api.tag_snapshot import tag_snapshot
+from recipes.models import (
+    Ingredient,
+    MeasurementUnit,
+    Recipe,
+    RecipeIngredient,
+    Tag,
+)
+from users.models import AuthUser
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=MeasurementUnit)
+@receiver(post_delete, sender=MeasurementUnit)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_recipes_cache(sender, **kwargs):
+    bump_generation()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=MeasurementUnit)
+@receiver(post_delete, sender=MeasurementUnit)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.bump()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_snapshot(sender, **kwargs):
+    tag_snapshot.bump()
+
+
+@receiver(post_save, sender=AuthUser)
+@receiver(post_delete, sender=AuthUser)
+def invalidate_recipes_cache_on_author_change(sender, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'last_login', 'password'}:
+        return
+    bump_generation()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_recipes_cache_on_relations_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_generation()
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token_cache(sender, instance, **kwargs):
+    token_cache.delete([instance.key])
+
+
+@receiver(post_save, sender=AuthUser)
+def invalidate_user_token_cache(sender, instance, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    token_cache.delete(Token.objects.filter(
+        user_id=instance.id).values_list('key', flat=True))
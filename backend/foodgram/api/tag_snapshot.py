@@ -0,0 +1,39 @@
+import json
+from collections import namedtuple
+from hashlib import sha1
+
+from api.cache import VersionedSnapshot
+from recipes.models import Tag
+
+TagCatalog = namedtuple('TagCatalog', ('tags', 'by_id', 'etag'))
+
+
+class TagSnapshot(VersionedSnapshot):
+    version_key = 'tags:version'
+
+    def load(self):
+        tags = tuple(
+            {'id': pk, 'name': name, 'color': color, 'slug': slug}
+            for pk, name, color, slug in Tag.objects.values_list(
+                'id', 'name', 'color', 'slug').order_by('id')
+        )
+        digest = sha1(
+            json.dumps(tags, ensure_ascii=False, sort_keys=True).encode()
+        ).hexdigest()
+        return TagCatalog(
+            tags, {tag['id']: tag for tag in tags}, f'"{digest}"')
+
+    def resolve(self, tag_ids, catalog=None):
+        tag_ids = list(tag_ids)
+        catalog = catalog or self.get()
+        missing = [
+            tag_id for tag_id in tag_ids if tag_id not in catalog.by_id]
+        if missing and Tag.objects.filter(id__in=missing).exists():
+            catalog = self.refresh()
+        return [
+            catalog.by_id[tag_id]
+            for tag_id in tag_ids if tag_id in catalog.by_id
+        ], catalog
+
+
+tag_snapshot = TagSnapshot()
@@ -0,0 +1,173 @@
+import json
+import tempfile
+from base64 import urlsafe_b64encode
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.tag_snapshot import tag_snapshot
+from recipes.models import (
+    Ingredient,
+    MeasurementUnit,
+    Recipe,
+    RecipeIngredient,
+    Tag,
+)
+from users.models import AuthUser
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tests',
+    }
+}
+
+
+@override_settings(CACHES=TEST_CACHES, IMAGE_PIPELINE_WORKERS=0)
+class RecipeUpdateQueriesTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = AuthUser.objects.create_user(
+            username='author',
+            email='author@example.com',
+            first_name='Автор',
+            last_name='Рецепта',
+            password='password',
+        )
+        unit = MeasurementUnit.objects.create(measurement_unit='г')
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit=unit)
+            for number in range(6)
+        ]
+        cls.tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast')
+        cls.recipe = Recipe.objects.create(
+            author=cls.user,
+            name='Омлет',
+            text='Взбить и пожарить',
+            cooking_time=10,
+        )
+        cls.recipe.tags.set([cls.tag])
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(
+                recipe=cls.recipe, ingredient=ingredient, amount=100)
+            for ingredient in cls.ingredients[:3]
+        ])
+
+    def setUp(self):
+        cache.clear()
+        tag_snapshot.get()
+        self.client.force_authenticate(self.user)
+
+    def patch_ingredients(self, amounts, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.id}/',
+                {
+                    'tags': [self.tag.id],
+                    'ingredients': [
+                        {'id': self.ingredients[index].id, 'amount': amount}
+                        for index, amount in amounts.items()
+                    ],
+                },
+                format='json',
+                HTTP_HOST='backend',
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            dict(RecipeIngredient.objects.filter(
+                recipe=self.recipe).values_list('ingredient', 'amount')),
+            {
+                self.ingredients[index].id: amount
+                for index, amount in amounts.items()
+            }
+        )
+
+    def test_unchanged_ingredients(self):
+        self.patch_ingredients({0: 100, 1: 100, 2: 100}, 11)
+
+    def test_partly_changed_ingredients(self):
+        self.patch_ingredients({0: 100, 1: 150, 3: 50}, 16)
+
+    def test_replaced_ingredients(self):
+        self.patch_ingredients({3: 10, 4: 20, 5: 30}, 15)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RecipeCursorPaginationTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = AuthUser.objects.create_user(
+            username='author',
+            email='author@example.com',
+            first_name='Автор',
+            last_name='Рецепта',
+            password='password',
+        )
+        Recipe.objects.bulk_create([
+            Recipe(
+                author=author,
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10,
+            )
+            for number in range(3)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def get_page(self, cursor):
+        return self.client.get(
+            '/api/recipes/', {'cursor': cursor, 'limit': 1},
+            HTTP_HOST='backend'
+        )
+
+    def test_next_cursor(self):
+        response = self.client.get(
+            '/api/recipes/', {'pagination': 'cursor', 'limit': 1},
+            HTTP_HOST='backend'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_tampered_cursor(self):
+        for position in ([None, None], [None], 'position'):
+            cursor = urlsafe_b64encode(
+                json.dumps({'r': 0, 'p': position}).encode()).decode()
+            self.assertEqual(
+                self.get_page(cursor).status_code,
+                status.HTTP_404_NOT_FOUND
+            )
+
+
+@override_settings(CACHES=TEST_CACHES, IMAGE_PIPELINE_WORKERS=0)
+class ImageUploadMemoryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        AuthUser.objects.create_user(
+            username='author',
+            email='author@example.com',
+            first_name='Автор',
+            last_name='Рецепта',
+            password='password',
+        )
+        Ingredient.objects.create(
+            name='Мука',
+            measurement_unit=MeasurementUnit.objects.create(
+                measurement_unit='г')
+        )
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+
+    def test_multipart_peak_does_not_grow_with_body(self):
+        with tempfile.TemporaryDirectory() as media_root:
+            with override_settings(MEDIA_ROOT=media_root):
+                call_command(
+                    'benchmark_image_upload', size=4, stdout=StringIO())
@@ -1,4 +1,32 @@
-from recipes.models import RecipeIngredient
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import (
+    Count,
+    F,
+    IntegerField,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Value,
+    Window,
+)
+from django.db.models.functions import Coalesce, Greatest, RowNumber
+
+from api.shopping_cart import get_amounts_delta
+from recipes.models import Recipe, RecipeIngredient, Subscribe
+
+
+def get_chunks(items, chunk_size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 
 def create_and_add_ingredients_to_recipe(recipe, ingredients):
@@ -6,11 +34,152 @@ def create_and_add_ingredients_to_recipe(recipe, ingredients):
     for ingredient in ingredients:
         recipe_ingredients.append(
             RecipeIngredient(
-                recipe_id=recipe.id,
+                recipe=recipe,
                 ingredient=ingredient.get('id'),
                 amount=ingredient.get('amount')
             )
         )
-    recipe_ingredients = RecipeIngredient.objects.bulk_create(
-        recipe_ingredients)
-    recipe.ingredients.add(*recipe_ingredients)
+    RecipeIngredient.objects.bulk_create(recipe_ingredients)
+
+
+def get_recipe_ingredients_prefetch():
+    return Prefetch(
+        'recipe_ingredients',
+        queryset=RecipeIngredient.objects.select_related(
+            'ingredient__measurement_unit').order_by('id')
+    )
+
+
+def update_recipe_ingredients(recipe, ingredients):
+    new_amounts = {
+        ingredient['id'].id: ingredient['amount'] for ingredient in ingredients
+    }
+    old_amounts = defaultdict(int)
+    updated = []
+    deleted = []
+    for recipe_ingredient in recipe.recipe_ingredients.all():
+        ingredient_id = recipe_ingredient.ingredient_id
+        amount = new_amounts.get(ingredient_id)
+        if ingredient_id in old_amounts or amount is None:
+            deleted.append(recipe_ingredient.id)
+        elif recipe_ingredient.amount != amount:
+            updated.append(recipe_ingredient)
+        old_amounts[ingredient_id] += recipe_ingredient.amount
+    for recipe_ingredient in updated:
+        recipe_ingredient.amount = new_amounts[recipe_ingredient.ingredient_id]
+    created = [
+        RecipeIngredient(
+            recipe=recipe, ingredient=ingredient['id'],
+            amount=ingredient['amount'])
+        for ingredient in ingredients if ingredient['id'].id not in old_amounts
+    ]
+    if deleted:
+        RecipeIngredient.objects.filter(id__in=deleted).delete()
+    if updated:
+        RecipeIngredient.objects.bulk_update(updated, ['amount'])
+    if created:
+        RecipeIngredient.objects.bulk_create(created)
+    return get_amounts_delta(old_amounts, new_amounts)
+
+
+class SubscriptionContext:
+    def __init__(self, user, preload_limit=None):
+        self.user = user
+        self.preload_limit = (settings.SUBSCRIPTIONS_PRELOAD_LIMIT
+                              if preload_limit is None else preload_limit)
+        self.author_ids = set()
+        self.checked_ids = set()
+        self.complete = False
+        self.page_mode = False
+
+    def get_subscriptions(self):
+        return Subscribe.objects.filter(
+            subscriber=self.user).values_list('author_id', flat=True)
+
+    def load_all(self):
+        author_ids = list(self.get_subscriptions()[:self.preload_limit + 1])
+        if len(author_ids) > self.preload_limit:
+            self.page_mode = True
+            return
+        self.author_ids = set(author_ids)
+        self.complete = True
+
+    def preload(self, authors):
+        if not self.user.is_authenticated or self.complete:
+            return
+        if not self.page_mode:
+            self.load_all()
+            if self.complete:
+                return
+        author_ids = {
+            author.id for author in authors if author is not None
+        } - self.checked_ids
+        if author_ids:
+            self.author_ids.update(
+                self.get_subscriptions().filter(author_id__in=author_ids))
+            self.checked_ids.update(author_ids)
+
+    def is_subscribed(self, author):
+        if not self.user.is_authenticated:
+            return False
+        if not self.complete and author.id not in self.checked_ids:
+            self.preload([author])
+        return author.id in self.author_ids
+
+
+def get_subscription_context(request):
+    context = getattr(request, 'subscription_context', None)
+    if context is None:
+        context = SubscriptionContext(request.user)
+        request.subscription_context = context
+    return context
+
+
+def get_recipes_limit(request):
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit and recipes_limit.isdigit() and int(recipes_limit) > 0:
+        return int(recipes_limit)
+    return None
+
+
+def get_recipes_by_author(author_ids, recipes_limit=None):
+    recipes = Recipe.objects.filter(author_id__in=author_ids)
+    if recipes_limit:
+        ranked = recipes.annotate(
+            author_position=Window(
+                expression=RowNumber(),
+                partition_by=[F('author_id')],
+                order_by=F('pub_date').desc()
+            )
+        ).order_by()
+        sql, params = ranked.query.get_compiler(ranked.db).as_sql()
+        quote_name = connections[ranked.db].ops.quote_name
+        recipes = Recipe.objects.raw(
+            (f'SELECT * FROM ({sql}) {quote_name("ranked")} '
+             f'WHERE {quote_name("author_position")} <= %s '
+             f'ORDER BY {quote_name("author_position")}'),
+            (*params, recipes_limit)
+        )
+    recipes_by_author = defaultdict(list)
+    for recipe in recipes:
+        recipes_by_author[recipe.author_id].append(recipe)
+    return recipes_by_author
+
+
+def change_counter(model, pk, field, delta):
+    return model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, Value(0))})
+
+
+def count_related(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                count=Count('pk')
+            ).values('count'),
+            output_field=IntegerField()
+        ),
+        0
+    )
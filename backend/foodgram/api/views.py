@@ -1,18 +1,37 @@
+from django.conf import settings
 from django.contrib.auth import password_validation
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags
 from rest_framework import (
     viewsets,
     mixins,
     decorators,
+    exceptions,
+    renderers,
     status,
     permissions,
 )
 from rest_framework.response import Response
 
+from api.bulk import (
+    NDJSONParser,
+    NDJSONRenderer,
+    bulk_create_recipes,
+    get_export_rows,
+)
+from api.cache import cache_anonymous_response
 from api.filters import IngredientFilter
+from api.ingredient_index import ingredient_index
 from api.permissions import AuthenticatedOrAuthorOrReadOnly
+from api.search import (
+    get_threshold,
+    ingredient_search,
+    recipe_search,
+    search_queryset,
+)
 from api.serializers import (
     AuthUserSerializer,
     AuthUserListSerializer,
@@ -22,6 +41,19 @@ from api.serializers import (
     SubscribeSerializer,
     TagSerializer,
 )
+from api.shopping_cart import (
+    SHOPPING_CART_RENDERERS,
+    ShoppingCartContentNegotiation,
+    add_recipe_to_shopping_cart_totals,
+    get_amounts_delta,
+    get_cart_user_ids,
+    get_recipe_amounts,
+    get_shopping_cart_ingredients,
+    remove_recipe_from_shopping_cart_totals,
+    update_shopping_cart_totals,
+)
+from api.tag_snapshot import tag_snapshot
+from api.utils import change_counter, get_recipe_ingredients_prefetch
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -42,6 +74,7 @@ class AuthUserViewSet(
     queryset = AuthUser.objects.all()
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = AuthUserSerializer
+    cursor_ordering = None
 
     def get_permissions(self):
         if self.action in ['list', 'create']:
@@ -89,7 +122,7 @@ class AuthUserViewSet(
             errors['password'] = list(err.messages)
             return Response(errors, status=status.HTTP_400_BAD_REQUEST)
         request.user.set_password(new_password)
-        request.user.save()
+        request.user.save(update_fields=['password'])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @decorators.action(
@@ -97,11 +130,12 @@ class AuthUserViewSet(
         detail=False,
         url_path='subscriptions',
         permission_classes=[permissions.IsAuthenticated],
+        cursor_ordering=('id',),
     )
     def subscriptions(self, request):
         subscriptions = AuthUser.objects.filter(
-            username__in=Subscribe.objects.filter(
-                subscriber=request.user).values_list('author__username'))
+            subscribes__subscriber=request.user
+        ).order_by('id')
         page = self.paginate_queryset(subscriptions)
         serializer = SubscribeSerializer(
             page,
@@ -134,7 +168,10 @@ class AuthUserViewSet(
                     {'errors': 'Вы не можете подписаться на самого себя.'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            Subscribe.objects.create(subscriber=request.user, author=author)
+            with transaction.atomic():
+                Subscribe.objects.create(
+                    subscriber=request.user, author=author)
+                change_counter(AuthUser, author.id, 'followers_count', 1)
             serializer = self.get_serializer(author)
             return Response(serializer.data)
         if not subscribe_exists:
@@ -142,7 +179,9 @@ class AuthUserViewSet(
                 {'errors': 'Вы не подписаны на этого автора.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        subscribe.delete()
+        with transaction.atomic():
+            subscribe.delete()
+            change_counter(AuthUser, author.id, 'followers_count', -1)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -152,20 +191,80 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = TagSerializer
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        catalog = tag_snapshot.get()
+        if_none_match = parse_etags(
+            request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if catalog.etag in if_none_match or '*' in if_none_match:
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers={'ETag': catalog.etag}
+            )
+        return Response(catalog.tags, headers={'ETag': catalog.etag})
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs['pk']
+        tags, _ = tag_snapshot.resolve([int(pk)] if pk.isdigit() else [])
+        if not tags:
+            raise Http404
+        return Response(tags[0])
+
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Ingredient.objects.all()
+    queryset = Ingredient.objects.select_related('measurement_unit')
     permission_classes = [permissions.AllowAny]
     serializer_class = IngredientSerializer
     pagination_class = None
     filter_backends = [IngredientFilter]
     search_fields = ('^name',)
 
+    def list(self, request, *args, **kwargs):
+        limit = request.query_params.get('limit')
+        limit = int(limit) if limit and limit.isdigit() else None
+        search = request.query_params.get('search')
+        if search:
+            ingredients = search_queryset(
+                self.get_queryset(),
+                search,
+                ingredient_search,
+                threshold=get_threshold(request)
+            )[:limit]
+            serializer = self.get_serializer(ingredients, many=True)
+            return Response(serializer.data)
+        if not settings.INGREDIENT_INDEX_ENABLED:
+            return super().list(request, *args, **kwargs)
+        return Response(ingredient_index.search(
+            request.query_params.get(IngredientFilter.search_param, ''),
+            limit
+        ))
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = [AuthenticatedOrAuthorOrReadOnly]
     serializer_class = RecipeSerializer
+    popular_ordering = ('-favorites_count', '-pub_date', '-id')
+
+    @property
+    def cursor_ordering(self):
+        if self.request.query_params.get('ordering') == 'popular':
+            return self.popular_ordering
+        return ('-pub_date', '-id')
+
+    def get_queryset(self):
+        queryset = super().get_queryset().prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('id')),
+            get_recipe_ingredients_prefetch()
+        ).select_related('author')
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')))
+        )
 
     def filter_queryset(self, queryset):
         if self.action != 'list':
@@ -185,45 +284,129 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if self.request.query_params.getlist('tags'):
             tags = self.request.query_params.getlist('tags')
             queryset = queryset.filter(tags__slug__in=tags).distinct()
+        popular = self.request.query_params.get('ordering') == 'popular'
+        search = self.request.query_params.get('search')
+        if search:
+            return search_queryset(
+                queryset,
+                search,
+                recipe_search,
+                get_threshold(self.request),
+                self.popular_ordering if popular else ('pk',),
+                not self.paginator.cursor_pagination_class.is_requested(
+                    self.request)
+            )
+        if popular:
+            queryset = queryset.order_by(*self.popular_ordering)
         return queryset
 
+    @cache_anonymous_response('list')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_anonymous_response('retrieve')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def get_serializer_class(self):
         if self.action in ['favorite', 'shopping_cart']:
             return RecipeFavoriteSerializer
         return super().get_serializer_class()
 
+    @transaction.atomic
     def perform_create(self, serializer):
+        change_counter(AuthUser, self.request.user.id, 'recipes_count', 1)
         return serializer.save(author=self.request.user)
 
+    @transaction.atomic
     def perform_destroy(self, instance):
-        instance.ingredients.all().delete()
+        update_shopping_cart_totals(
+            get_cart_user_ids(instance),
+            get_amounts_delta(get_recipe_amounts(instance), {})
+        )
+        if instance.author_id is not None:
+            change_counter(
+                AuthUser, instance.author_id, 'recipes_count', -1)
         instance.delete()
 
+    @decorators.action(
+        methods=['post'],
+        detail=False,
+        url_path='bulk',
+        permission_classes=[permissions.IsAuthenticated],
+        parser_classes=[NDJSONParser],
+        renderer_classes=[NDJSONRenderer, renderers.JSONRenderer],
+    )
+    def bulk(self, request):
+        results = bulk_create_recipes(
+            request.data,
+            RecipeSerializer,
+            self.get_serializer_context()
+        )
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, NDJSONRenderer):
+            return Response(list(results))
+        return StreamingHttpResponse(
+            renderer.stream(results),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+
+    @decorators.action(
+        methods=['get'],
+        detail=False,
+        url_path='export',
+        renderer_classes=[NDJSONRenderer],
+    )
+    def export(self, request):
+        author_id = request.query_params.get('author')
+        if author_id is None:
+            if not request.user.is_authenticated:
+                raise exceptions.NotAuthenticated
+            author_id = str(request.user.id)
+        if not author_id.isdigit():
+            raise Http404
+        author = get_object_or_404(AuthUser, id=author_id)
+        embed_images = request.query_params.get('image') == 'base64'
+        if embed_images and author.id != request.user.id:
+            if not request.user.is_authenticated:
+                raise exceptions.NotAuthenticated
+            raise exceptions.PermissionDenied(
+                'Встроить картинки можно только в выгрузку своих рецептов.')
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(get_export_rows(
+                Recipe.objects.filter(author=author),
+                request,
+                embed_images
+            )),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename=recipes_{author.id}.{renderer.format}')
+        return response
+
     @decorators.action(
         methods=['get'],
         detail=False,
         url_path='download_shopping_cart',
-        permission_classes=[permissions.IsAuthenticated]
+        permission_classes=[permissions.IsAuthenticated],
+        renderer_classes=SHOPPING_CART_RENDERERS,
+        content_negotiation_class=ShoppingCartContentNegotiation,
     )
     def download_shopping_cart(self, request):
-        response = HttpResponse(content_type='text/plain')
-        response['Content-Disposition'] = ('attachment; '
-                                           'filename=shopping_cart.txt')
-        shopping_carts = ShoppingCart.objects.filter(user=request.user)
-        ingredients = shopping_carts.values_list(
-            'recipe__ingredients__ingredient__name',
-            ('recipe__ingredients__ingredient__measurement_unit__'
-             'measurement_unit')
-        ).annotate(Sum('recipe__ingredients__amount'))
-        lines = []
-        for ingredient in ingredients:
-            lines.append(
-                f'- {ingredient[0]} [{ingredient[1]}]: {ingredient[2]}\n'
-            )
-        response.writelines(lines)
+        renderer = request.accepted_renderer
+        content = renderer.stream(get_shopping_cart_ingredients(request.user))
+        if renderer.streaming:
+            response = StreamingHttpResponse(
+                content, content_type=renderer.get_content_type())
+        else:
+            response = HttpResponse(
+                b''.join(content), content_type=renderer.get_content_type())
+        response['Content-Disposition'] = (
+            f'attachment; filename={renderer.get_filename()}')
         return response
 
-    def favorite_and_shopping_cart(self, request, pk, model):
+    def favorite_and_shopping_cart(self, request, pk, model, counter):
         recipe = get_object_or_404(Recipe, id=pk)
         instance = model.objects.filter(
             user=self.request.user,
@@ -236,10 +419,14 @@ class RecipeViewSet(viewsets.ModelViewSet):
                     {'errors': 'Этот рецепт уже добавлен.'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            model.objects.create(
-                user=self.request.user,
-                recipe=recipe
-            )
+            with transaction.atomic():
+                model.objects.create(
+                    user=self.request.user,
+                    recipe=recipe
+                )
+                change_counter(Recipe, recipe.id, counter, 1)
+                if model is ShoppingCart:
+                    add_recipe_to_shopping_cart_totals(request.user, recipe)
             serializer = self.get_serializer(recipe)
             return Response(serializer.data)
         if not instance_exists:
@@ -247,7 +434,11 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 {'errors': 'Этот рецепт не был добавлен.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        instance.delete()
+        with transaction.atomic():
+            instance.delete()
+            change_counter(Recipe, recipe.id, counter, -1)
+            if model is ShoppingCart:
+                remove_recipe_from_shopping_cart_totals(request.user, recipe)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @decorators.action(
@@ -256,7 +447,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_path='favorite'
     )
     def favorite(self, request, pk):
-        return self.favorite_and_shopping_cart(request, pk, Favorite)
+        return self.favorite_and_shopping_cart(
+            request, pk, Favorite, 'favorites_count')
 
     @decorators.action(
         methods=['post', 'delete'],
@@ -264,4 +456,5 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_path='shopping_cart'
     )
     def shopping_cart(self, request, pk):
-        return self.favorite_and_shopping_cart(request, pk, ShoppingCart)
+        return self.favorite_and_shopping_cart(
+            request, pk, ShoppingCart, 'in_carts_count')
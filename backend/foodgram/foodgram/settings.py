@@ -17,6 +17,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 THIRD_PARTY_APPS = [
@@ -36,6 +37,8 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 AUTH_USER_MODEL = 'users.AuthUser'
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -43,6 +46,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -114,14 +118,109 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media/'
+DEFAULT_FILE_STORAGE = 'api.storage.ContentAddressedStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND',
+    default='django.core.cache.backends.memcached.PyMemcacheCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', default='memcached:11211'),
+        'OPTIONS': {
+            'ignore_exc': True,
+            'connect_timeout': 0.5,
+            'timeout': 0.5,
+        } if CACHE_BACKEND.endswith('.PyMemcacheCache') else {},
+    }
+}
+
+RECIPES_CACHE_ALIAS = 'default'
+RECIPES_CACHE_TIMEOUT = int(os.getenv('RECIPES_CACHE_TIMEOUT', default=300))
+RECIPES_CACHE_COUNTERS_TIMEOUT = int(
+    os.getenv('RECIPES_CACHE_COUNTERS_TIMEOUT', default=86400))
+RECIPES_CACHE_STATS_SAMPLE_RATE = float(
+    os.getenv('RECIPES_CACHE_STATS_SAMPLE_RATE', default=0.01))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS':
         'api.pagination.PageLimitPagination',
     'PAGE_SIZE': 6,
 }
+
+SUBSCRIPTIONS_PRELOAD_LIMIT = int(
+    os.getenv('SUBSCRIPTIONS_PRELOAD_LIMIT', default=1000))
+
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
+
+INGREDIENT_INDEX_ENABLED = os.getenv(
+    'INGREDIENT_INDEX_ENABLED', default='True') == 'True'
+INGREDIENT_INDEX_CHECK_INTERVAL = float(
+    os.getenv('INGREDIENT_INDEX_CHECK_INTERVAL', default=5))
+
+SEARCH_SIMILARITY_THRESHOLD = float(
+    os.getenv('SEARCH_SIMILARITY_THRESHOLD', default=0.3))
+
+IMAGE_PIPELINE_WORKERS = int(os.getenv('IMAGE_PIPELINE_WORKERS', default=2))
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+IMAGE_CARD_WIDTH = 640
+IMAGE_CARD_FORMAT = 'jpeg'
+
+RECIPES_BULK_CHUNK_SIZE = int(os.getenv('RECIPES_BULK_CHUNK_SIZE', default=20))
+
+SQL_INSTRUMENTATION_ENABLED = os.getenv(
+    'SQL_INSTRUMENTATION_ENABLED', default='True') == 'True'
+SQL_INSTRUMENTATION_SAMPLE_RATE = float(
+    os.getenv('SQL_INSTRUMENTATION_SAMPLE_RATE', default=0.01))
+SQL_INSTRUMENTATION_HEADER = 'HTTP_X_SERVER_TIMING'
+SQL_INSTRUMENTATION_TOKEN_MAX_AGE = 3600
+SQL_REPEATED_QUERY_THRESHOLD = 3
+SLOW_REQUEST_THRESHOLD_MS = float(
+    os.getenv('SLOW_REQUEST_THRESHOLD_MS', default=500))
+SLOW_REQUEST_LOGGED_QUERIES = 5
+
+METRICS_DIR = os.getenv('METRICS_DIR', default='')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', default=1))
+METRICS_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_LOCAL_TTL = float(
+    os.getenv('AUTH_TOKEN_CACHE_LOCAL_TTL', default=5))
+AUTH_TOKEN_CACHE_ALIAS = os.getenv('AUTH_TOKEN_CACHE_ALIAS', default='')
+AUTH_TOKEN_CACHE_SHARED_TTL = int(
+    os.getenv('AUTH_TOKEN_CACHE_SHARED_TTL', default=300))
+
+PROFILING_SAMPLE_RATE = float(
+    os.getenv('PROFILING_SAMPLE_RATE', default=0))
+PROFILING_HEADER = 'HTTP_X_PROFILE'
+PROFILING_QUERY_PARAM = 'profile'
+PROFILING_TOKEN_MAX_AGE = 3600
+PROFILING_LOGGED_QUERIES = 500
+PROFILING_RETENTION_DAYS = int(
+    os.getenv('PROFILING_RETENTION_DAYS', default=7))
+PROFILING_MAX_PROFILES = int(
+    os.getenv('PROFILING_MAX_PROFILES', default=1000))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api': {
+            'handlers': ['console'],
+            'level': os.getenv('API_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
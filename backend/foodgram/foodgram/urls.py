@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from api.metrics import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/', include('api.urls'))
+    path('api/', include('api.urls')),
+    path('metrics', metrics),
 ]
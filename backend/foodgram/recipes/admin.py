@@ -1,5 +1,11 @@
 from django.contrib import admin
 
+from api.shopping_cart import (
+    get_amounts_delta,
+    get_cart_user_ids,
+    get_recipe_amounts,
+    update_shopping_cart_totals,
+)
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -7,6 +13,7 @@ from recipes.models import (
     Recipe,
     RecipeIngredient,
     ShoppingCart,
+    ShoppingCartIngredient,
     Subscribe,
     Tag,
 )
@@ -29,20 +36,34 @@ class IngredientAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 
+class RecipeIngredientInline(admin.TabularInline):
+    model = RecipeIngredient
+    autocomplete_fields = ('ingredient',)
+    extra = 1
+
+
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author')
+    list_display = ('name', 'author', 'favorites_count')
     list_filter = ('name', 'author', 'tags')
-    readonly_fields = ('favorite_count',)
+    readonly_fields = ('favorites_count', 'in_carts_count')
+    inlines = (RecipeIngredientInline,)
 
-    @admin.display(description='Добавлен в избранное')
-    def favorite_count(self, recipe):
-        return Favorite.objects.filter(recipe=recipe).count()
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not RecipeIngredient:
+            return super().save_formset(request, form, formset, change)
+        recipe = form.instance
+        old_amounts = get_recipe_amounts(recipe)
+        super().save_formset(request, form, formset, change)
+        update_shopping_cart_totals(
+            get_cart_user_ids(recipe),
+            get_amounts_delta(old_amounts, get_recipe_amounts(recipe))
+        )
 
 
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
-    list_display = ('recipe_id', 'ingredient', 'amount')
+    list_display = ('recipe', 'ingredient', 'amount')
     list_filter = ('ingredient',)
 
 
@@ -56,6 +77,12 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
 
 
+@admin.register(ShoppingCartIngredient)
+class ShoppingCartIngredientAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'ingredient', 'amount')
+    list_filter = ('user',)
+
+
 @admin.register(Subscribe)
 class SubscribeAdmin(admin.ModelAdmin):
     list_display = ('id', 'subscriber', 'author')
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='recipeingredient',
+            name='unique_recipeingredients',
+        ),
+        migrations.RenameField(
+            model_name='recipeingredient',
+            old_name='recipe_id',
+            new_name='legacy_recipe_id',
+        ),
+        migrations.AlterField(
+            model_name='recipeingredient',
+            name='legacy_recipe_id',
+            field=models.IntegerField(help_text='Идентификатор рецепта', null=True, verbose_name='Рецепт'),
+        ),
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='recipe',
+            field=models.ForeignKey(help_text='Укажите рецепт', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+    ]
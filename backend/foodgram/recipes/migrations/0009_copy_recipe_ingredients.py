@@ -0,0 +1,93 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+BATCH_SIZE = 1000
+
+
+def get_links_model(apps):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    return Recipe._meta.get_field('ingredients').remote_field.through
+
+
+def copy_recipe_ingredients(apps, schema_editor):
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    Link = get_links_model(apps)
+    last_id = 0
+    while True:
+        links = list(Link.objects.filter(id__gt=last_id).order_by(
+            'id').values_list('id', 'recipe_id', 'recipeingredient_id')[
+                :BATCH_SIZE])
+        if not links:
+            break
+        last_id = links[-1][0]
+        rows = RecipeIngredient.objects.in_bulk(
+            {row_id for _, _, row_id in links})
+        updated = []
+        copies = []
+        for _, recipe_id, row_id in links:
+            row = rows[row_id]
+            if row.recipe_id is None:
+                row.recipe_id = recipe_id
+                updated.append(row)
+            else:
+                copies.append(RecipeIngredient(
+                    recipe_id=recipe_id,
+                    legacy_recipe_id=recipe_id,
+                    ingredient_id=row.ingredient_id,
+                    amount=row.amount
+                ))
+        RecipeIngredient.objects.bulk_update(
+            updated, ['recipe'], batch_size=BATCH_SIZE)
+        RecipeIngredient.objects.bulk_create(copies, batch_size=BATCH_SIZE)
+    RecipeIngredient.objects.filter(recipe__isnull=True).delete()
+    remove_duplicates(RecipeIngredient)
+
+
+def remove_duplicates(RecipeIngredient):
+    groups = RecipeIngredient.objects.values(
+        'recipe', 'ingredient', 'amount'
+    ).annotate(
+        rows=Count('id'), keep_id=Min('id')
+    ).filter(rows__gt=1).order_by()
+    duplicates = []
+    for group in groups.iterator():
+        duplicates.extend(RecipeIngredient.objects.filter(
+            recipe_id=group['recipe'],
+            ingredient_id=group['ingredient'],
+            amount=group['amount']
+        ).exclude(id=group['keep_id']).values_list('id', flat=True))
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        RecipeIngredient.objects.filter(
+            id__in=duplicates[start:start + BATCH_SIZE]).delete()
+
+
+def restore_recipe_links(apps, schema_editor):
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    Link = get_links_model(apps)
+    RecipeIngredient.objects.update(legacy_recipe_id=models.F('recipe_id'))
+    last_id = 0
+    while True:
+        rows = list(RecipeIngredient.objects.filter(id__gt=last_id).order_by(
+            'id').values_list('id', 'recipe_id')[:BATCH_SIZE])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        Link.objects.bulk_create(
+            [
+                Link(recipe_id=recipe_id, recipeingredient_id=row_id)
+                for row_id, recipe_id in rows
+            ],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipeingredient_recipe_fk'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_recipe_ingredients, restore_recipe_links),
+    ]
@@ -76,9 +76,12 @@ class Ingredient(models.Model):
 
 
 class RecipeIngredient(models.Model):
-    recipe_id = models.IntegerField(
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='recipe_ingredients',
         verbose_name='Рецепт',
-        help_text='Идентификатор рецепта',
+        help_text='Укажите рецепт'
     )
     ingredient = models.ForeignKey(
         Ingredient,
@@ -97,7 +100,7 @@ class RecipeIngredient(models.Model):
         verbose_name_plural = 'Ингредиенты в рецепте'
         constraints = [
             models.UniqueConstraint(
-                fields=['recipe_id', 'ingredient', 'amount'],
+                fields=['recipe', 'ingredient', 'amount'],
                 name='unique_recipeingredients'
             )
         ]
@@ -123,7 +126,8 @@ class Recipe(models.Model):
         help_text='Укажите автора'
     )
     ingredients = models.ManyToManyField(
-        RecipeIngredient,
+        Ingredient,
+        through=RecipeIngredient,
         related_name='recipes',
         verbose_name='Ингредиенты',
         help_text='Укажите ингредиенты'
@@ -138,6 +142,12 @@ class Recipe(models.Model):
         upload_to='recipes/images/',
         blank=True,
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Варианты картинки',
+    )
     text = models.TextField(
         verbose_name='Описание рецепта',
         help_text='Введите описание рецепта'
@@ -147,11 +157,29 @@ class Recipe(models.Model):
         help_text='Введите время приготовления (в минутах)'
     )
     pub_date = models.DateTimeField(auto_now_add=True)
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлен в избранное',
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлен в корзину покупок',
+    )
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='recipes_pub_date_id_idx'),
+            models.Index(
+                fields=['-favorites_count', '-pub_date', '-id'],
+                name='recipes_popular_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name[:30]
@@ -213,6 +241,42 @@ class ShoppingCart(models.Model):
         return f'{self.user.username[:30]} -> {self.recipe.username[:30]}'
 
 
+class ShoppingCartIngredient(models.Model):
+    user = models.ForeignKey(
+        AuthUser,
+        related_name='shopping_cart_ingredients',
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        help_text='Укажите пользователя',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        related_name='shopping_cart_ingredients',
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+        help_text='Укажите ингредиент'
+    )
+    amount = models.IntegerField(
+        default=0,
+        verbose_name='Количество',
+        help_text='Суммарное количество в корзине покупок'
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент в корзине покупок'
+        verbose_name_plural = 'Ингредиенты в корзине покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_cart_ingredients'
+            )
+        ]
+
+    def __str__(self):
+        return (f'{self.user.username[:30]} -> '
+                f'{self.ingredient.name[:30]}: {self.amount}')
+
+
 class Subscribe(models.Model):
     subscriber = models.ForeignKey(
         AuthUser,
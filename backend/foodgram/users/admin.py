@@ -5,6 +5,14 @@ from users.models import AuthUser
 
 @admin.register(AuthUser)
 class AuthUserAdmin(admin.ModelAdmin):
-    list_display = ('username', 'email', 'last_login', 'date_joined')
+    list_display = (
+        'username',
+        'email',
+        'last_login',
+        'date_joined',
+        'followers_count',
+        'recipes_count',
+    )
+    readonly_fields = ('followers_count', 'recipes_count')
     list_filter = ('username', 'email')
     search_fields = ('username', 'email')
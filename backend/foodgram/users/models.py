@@ -30,6 +30,16 @@ class AuthUser(AbstractUser):
         verbose_name='Фамилия',
         help_text='Введите фамилию',
     )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписчики',
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рецепты',
+    )
 
     EMAIL_FIELD = 'email'
     USERNAME_FIELD = 'email'